@@ -117,6 +117,35 @@ export class GeneAnnotationService {
     }
   }
 
+  /**
+   * Find genes overlapping a single position (daemon gene interval index)
+   */
+  async findGenesAtPosition(chrom: string, pos: number): Promise<GeneLookupResult> {
+    try {
+      const query = {
+        type: 'genes_at_position',
+        chrom: chrom,
+        pos: pos
+      };
+
+      const result = await this.daemonClient.executeQuery(query);
+      
+      return {
+        found: result.genes && result.genes.length > 0,
+        genes: result.genes || [],
+        search_type: 'by_position'
+      };
+
+    } catch (error) {
+      console.error('Error finding genes at position:', error);
+      return {
+        found: false,
+        genes: [],
+        search_type: 'by_position'
+      };
+    }
+  }
+
   /**
    * Annotate variants with gene information
    */
@@ -132,12 +161,7 @@ export class GeneAnnotationService {
     for (const variant of variants) {
       try {
         // Find overlapping genes (position within gene boundaries)
-        const overlappingGenes = await this.findGenesInRegion(
-          variant.chrom, 
-          variant.pos - 1, // Expand by 1bp to catch boundary cases
-          variant.pos + 1,
-          { limit: 50 }
-        );
+        const overlappingGenes = await this.findGenesAtPosition(variant.chrom, variant.pos);
 
         // Find nearby genes (within 10kb) if no overlapping genes
         let nearbyGenes: GeneLookupResult | null = null;
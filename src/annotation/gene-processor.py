@@ -11,31 +11,115 @@ import sys
 import gzip
 import json
 import time
+import shutil
 import argparse
-from typing import Dict, List, Tuple, Optional
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Optional, Union
 from dataclasses import dataclass
 from pathlib import Path
 
 import tiledb
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.compute as pc
 
-@dataclass
-class GeneAnnotation:
-    gene_id: str
-    gene_name: str
-    gene_type: str
-    chrom: str
-    start: int
-    end: int
-    strand: str
-    source: str
-    transcript_id: Optional[str] = None
-    exon_number: Optional[int] = None
-    feature_type: str = 'gene'
+# ISA-L accelerated gzip is optional; fall back to pigz or the stdlib decompressor
+try:
+    from isal import igzip
+except ImportError:
+    igzip = None
+
+# Read buffer for decompressed GTF streams
+GTF_READ_BUFFER_SIZE = 1 << 22
+
+# GTF blocks processed concurrently (also bounds how many raw blocks are held in memory)
+GTF_PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Chromosome name (without 'chr' prefix) -> TileDB chrom coordinate
+CHROM_MAP = {**{str(i): i for i in range(1, 23)}, 'X': 23, 'Y': 24, 'MT': 25, 'M': 25}
+UNKNOWN_CHROM = 999
+
+_CHROM_NAMES = pa.array(list(CHROM_MAP))
+_CHROM_CODES = np.array(list(CHROM_MAP.values()) + [UNKNOWN_CHROM], dtype=np.int16)
+
+# Fixed vocabularies for dictionary-encoded (TileDB enumeration) attributes
+FEATURE_TYPES = ['CDS', 'UTR', 'exon', 'gene', 'transcript']
+STRANDS = ['+', '-', '.']
+
+# Compression pipelines: zstd for strings/codes, delta coding for sorted integer coordinates
+STRING_FILTERS = tiledb.FilterList([tiledb.ZstdFilter(level=9)])
+CODE_FILTERS = tiledb.FilterList([tiledb.ZstdFilter(level=5)])
+INTEGER_FILTERS = tiledb.FilterList([tiledb.DoubleDeltaFilter(), tiledb.BitShuffleFilter(), tiledb.ZstdFilter(level=5)])
+OFFSETS_FILTERS = tiledb.FilterList([tiledb.DoubleDeltaFilter(), tiledb.ZstdFilter(level=-1)])
+
+# Cells per data tile: small for the genome-wide gene table (point lookups), large for bulk features
+GENE_REGIONS_CAPACITY = 10_000
+GENE_FEATURES_CAPACITY = 100_000
+
+# Rows converted to NumPy per write when a whole feature table is written at once
+FEATURE_WRITE_BATCH_SIZE = 500_000
+
+def chromosome_codes(chroms) -> np.ndarray:
+    """Vectorized chromosome_to_int over an Arrow string column"""
+    idx = pc.index_in(pc.replace_substring(chroms, 'chr', ''), value_set=_CHROM_NAMES)
+    return _CHROM_CODES[pc.fill_null(idx, len(_CHROM_NAMES)).to_numpy()]
+
+# GTF column layout (https://www.gencodegenes.org/pages/data_format.html)
+GTF_COLUMNS = ['chrom', 'source', 'feature_type', 'start', 'end', 'score', 'strand', 'frame', 'attributes']
+
+# Columns materialized by the Arrow reader; score and frame are never converted
+GTF_COLUMN_TYPES = {
+    'chrom': pa.string(),
+    'source': pa.string(),
+    'feature_type': pa.string(),
+    'start': pa.uint32(),
+    'end': pa.uint32(),
+    'strand': pa.string(),
+    'attributes': pa.string()
+}
+
+# Features kept for annotation; everything else is filtered out while reading
+ALLOWED_FEATURES = ['gene', 'transcript', 'exon', 'CDS', 'five_prime_UTR', 'three_prime_UTR']
+
+# GTF feature type -> normalized category
+_FEATURE_MAP = {
+    'five_prime_UTR': 'UTR',
+    'three_prime_UTR': 'UTR',
+    'CDS': 'CDS',
+    'exon': 'exon',
+    'transcript': 'transcript',
+    'gene': 'gene'
+}
+_FEATURE_MAP_KEYS = pa.array(list(_FEATURE_MAP))
+_FEATURE_MAP_VALUES = pa.array(list(_FEATURE_MAP.values()))
+
+# Attribute extraction patterns, applied column-at-a-time to the 9th GTF field.
+# Arrow evaluates these with RE2 (automaton-based, no backtracking).
+GTF_ATTRIBUTE_PATTERNS = {
+    'gene_id': r'(?:^|;\s*)gene_id "(?P<gene_id>[^"]+)"',
+    'gene_name': r'(?:^|;\s*)gene_name "(?P<gene_name>[^"]+)"',
+    'gene_type': r'(?:^|;\s*)gene_type "(?P<gene_type>[^"]+)"',
+    'gene_biotype': r'(?:^|;\s*)gene_biotype "(?P<gene_biotype>[^"]+)"',
+    'transcript_id': r'(?:^|;\s*)transcript_id "(?P<transcript_id>[^"]+)"',
+    'exon_number': r'(?:^|;\s*)exon_number "?(?P<exon_number>\d+)',
+}
+
+def chromosome_slices(chrom_coords: np.ndarray) -> Iterator[slice]:
+    """Yield the contiguous block of each chromosome in a chrom-sorted coordinate column"""
+    boundaries = np.flatnonzero(chrom_coords[1:] != chrom_coords[:-1]) + 1
+    edges = [0, *boundaries.tolist(), len(chrom_coords)]
+    for block_start, block_end in zip(edges[:-1], edges[1:]):
+        if block_end > block_start:
+            yield slice(block_start, block_end)
 
 @dataclass
 class GeneRegion:
     gene_name: str
+    gene_id: str
     chrom: str
     start: int
     end: int
@@ -44,6 +128,59 @@ class GeneRegion:
     transcript_count: int
     clinical_significance: Optional[str] = None
 
+class GeneIntervalIndex:
+    """Sorted-interval index over gene regions for point-in-gene lookups
+    
+    Genes are sorted by (chrom, start) and each chromosome keeps a running maximum
+    of gene ends, so a lookup is two binary searches plus a scan over the genes
+    whose span can still reach the queried position.
+    """
+    
+    def __init__(self, chroms: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                 gene_names: np.ndarray, gene_ids: np.ndarray):
+        order = np.lexsort((starts, chroms))
+        self.chroms = np.asarray(chroms)[order]
+        self.starts = np.asarray(starts)[order]
+        self.ends = np.asarray(ends)[order]
+        self.gene_names = np.asarray(gene_names, dtype=str)[order]
+        self.gene_ids = np.asarray(gene_ids, dtype=str)[order]
+        
+        self.blocks = {}
+        self.max_ends = np.empty_like(self.ends)
+        for block in chromosome_slices(self.chroms):
+            self.blocks[int(self.chroms[block.start])] = block
+            self.max_ends[block] = np.maximum.accumulate(self.ends[block])
+    
+    def find_overlaps(self, chrom: int, pos: int) -> np.ndarray:
+        """Return indices of genes with start <= pos <= end on the given chromosome"""
+        block = self.blocks.get(chrom)
+        if block is None:
+            return np.empty(0, dtype=np.intp)
+        
+        starts = self.starts[block]
+        hi = np.searchsorted(starts, pos, side='right')
+        lo = np.searchsorted(self.max_ends[block][:hi], pos, side='left')
+        
+        candidates = np.arange(lo, hi)
+        return candidates[self.ends[block][lo:hi] >= pos] + block.start
+    
+    def save(self, path: str) -> None:
+        """Persist the index next to the TileDB array"""
+        np.savez_compressed(
+            path,
+            chroms=self.chroms,
+            starts=self.starts,
+            ends=self.ends,
+            gene_names=self.gene_names,
+            gene_ids=self.gene_ids
+        )
+    
+    @classmethod
+    def load(cls, path: str) -> 'GeneIntervalIndex':
+        """Load an index written by save()"""
+        with np.load(path) as data:
+            return cls(data['chroms'], data['starts'], data['ends'], data['gene_names'], data['gene_ids'])
+
 class GeneAnnotationProcessor:
     """Process GENCODE GTF files and create TileDB gene annotation arrays"""
     
@@ -59,6 +196,14 @@ class GeneAnnotationProcessor:
         self.gene_regions_array = os.path.join(self.arrays_dir, 'gene_regions')
         self.gene_features_array = os.path.join(self.arrays_dir, 'gene_features')
         
+        # In-memory interval index over gene regions (rebuilt on every regions write)
+        self.gene_index_path = os.path.join(self.arrays_dir, 'gene_regions_index.npz')
+        self._gene_index = None
+        
+        # (array uri, attribute) -> (enumeration, its values as Arrow strings, code dtype); seeded
+        # from the schema on first use and kept current as the enumerations are extended
+        self._enum_vocabularies = {}
+        
         # Clinical gene definitions
         self.clinical_genes = {
             # Cancer genes
@@ -108,25 +253,41 @@ class GeneAnnotationProcessor:
         
         # Dimensions: chromosome and position for fast overlap queries
         dims = [
-            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8),  # 1-22, X=23, Y=24, MT=25
-            tiledb.Dim(name="start", domain=(1, 300_000_000), tile=100_000, dtype=np.uint32)
+            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8, filters=CODE_FILTERS),  # 1-22, X=23, Y=24, MT=25
+            tiledb.Dim(name="start", domain=(1, 300_000_000), tile=100_000, dtype=np.uint32, filters=INTEGER_FILTERS)
+        ]
+        
+        # Low-cardinality strings are dictionary-encoded; gene_type grows as new biotypes are written
+        enums = [
+            tiledb.Enumeration("gene_type", False, dtype=str),
+            tiledb.Enumeration("strand", False, STRANDS),
+            tiledb.Enumeration("clinical_significance", False, [''] + sorted(set(self.clinical_genes.values()))),
         ]
         
         # Attributes: gene information
         attrs = [
-            tiledb.Attr(name="gene_name", dtype='U50'),
-            tiledb.Attr(name="gene_id", dtype='U30'),
-            tiledb.Attr(name="gene_type", dtype='U30'),
-            tiledb.Attr(name="end", dtype=np.uint32),
-            tiledb.Attr(name="strand", dtype='U1'),
-            tiledb.Attr(name="transcript_count", dtype=np.uint16),
-            tiledb.Attr(name="clinical_significance", dtype='U200'),
-            tiledb.Attr(name="is_clinical", dtype=bool),
+            tiledb.Attr(name="gene_name", dtype='U50', filters=STRING_FILTERS),
+            tiledb.Attr(name="gene_id", dtype='U30', filters=STRING_FILTERS),
+            tiledb.Attr(name="gene_type", dtype=np.uint16, enum_label="gene_type", filters=CODE_FILTERS),
+            tiledb.Attr(name="end", dtype=np.uint32, filters=INTEGER_FILTERS),
+            tiledb.Attr(name="strand", dtype=np.uint8, enum_label="strand", filters=CODE_FILTERS),
+            tiledb.Attr(name="transcript_count", dtype=np.uint16, filters=CODE_FILTERS),
+            tiledb.Attr(name="clinical_significance", dtype=np.uint8, enum_label="clinical_significance", filters=CODE_FILTERS),
+            tiledb.Attr(name="is_clinical", dtype=bool, filters=CODE_FILTERS),
         ]
         
         # Create sparse array schema (genes are sparse across genome)
         domain = tiledb.Domain(*dims)
-        schema = tiledb.ArraySchema(domain=domain, sparse=True, attrs=attrs)
+        schema = tiledb.ArraySchema(
+            domain=domain,
+            sparse=True,
+            attrs=attrs,
+            enums=enums,
+            capacity=GENE_REGIONS_CAPACITY,
+            cell_order='row-major',
+            tile_order='row-major',
+            offsets_filters=OFFSETS_FILTERS
+        )
         
         return schema
     
@@ -135,291 +296,450 @@ class GeneAnnotationProcessor:
         
         # Dimensions: chromosome, position, and feature type
         dims = [
-            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8),
-            tiledb.Dim(name="start", domain=(1, 300_000_000), tile=50_000, dtype=np.uint32),
-            tiledb.Dim(name="feature_id", domain=(1, 10_000_000), tile=10_000, dtype=np.uint32)
+            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8, filters=CODE_FILTERS),
+            tiledb.Dim(name="start", domain=(1, 300_000_000), tile=50_000, dtype=np.uint32, filters=INTEGER_FILTERS),
+            tiledb.Dim(name="feature_id", domain=(1, 10_000_000), tile=10_000, dtype=np.uint32, filters=INTEGER_FILTERS)
+        ]
+        
+        # Low-cardinality strings are dictionary-encoded; source grows as new annotation sources are written
+        enums = [
+            tiledb.Enumeration("feature_type", False, FEATURE_TYPES),
+            tiledb.Enumeration("strand", False, STRANDS),
+            tiledb.Enumeration("source", False, dtype=str),
         ]
         
         # Attributes: detailed feature information
         attrs = [
-            tiledb.Attr(name="gene_name", dtype='U50'),
-            tiledb.Attr(name="gene_id", dtype='U30'),
-            tiledb.Attr(name="transcript_id", dtype='U30'),
-            tiledb.Attr(name="feature_type", dtype='U20'),  # gene, transcript, exon, CDS, UTR
-            tiledb.Attr(name="end", dtype=np.uint32),
-            tiledb.Attr(name="strand", dtype='U1'),
-            tiledb.Attr(name="exon_number", dtype=np.uint16),
-            tiledb.Attr(name="source", dtype='U20'),
+            tiledb.Attr(name="gene_name", dtype='U50', filters=STRING_FILTERS),
+            tiledb.Attr(name="gene_id", dtype='U30', filters=STRING_FILTERS),
+            tiledb.Attr(name="transcript_id", dtype='U30', filters=STRING_FILTERS),
+            tiledb.Attr(name="feature_type", dtype=np.uint8, enum_label="feature_type", filters=CODE_FILTERS),  # gene, transcript, exon, CDS, UTR
+            tiledb.Attr(name="end", dtype=np.uint32, filters=INTEGER_FILTERS),
+            tiledb.Attr(name="strand", dtype=np.uint8, enum_label="strand", filters=CODE_FILTERS),
+            tiledb.Attr(name="exon_number", dtype=np.uint16, filters=CODE_FILTERS),
+            tiledb.Attr(name="source", dtype=np.uint16, enum_label="source", filters=CODE_FILTERS),
         ]
         
         domain = tiledb.Domain(*dims)
-        schema = tiledb.ArraySchema(domain=domain, sparse=True, attrs=attrs)
+        schema = tiledb.ArraySchema(
+            domain=domain,
+            sparse=True,
+            attrs=attrs,
+            enums=enums,
+            capacity=GENE_FEATURES_CAPACITY,
+            cell_order='row-major',
+            tile_order='row-major',
+            offsets_filters=OFFSETS_FILTERS
+        )
         
         return schema
     
     def chromosome_to_int(self, chrom: str) -> int:
         """Convert chromosome string to integer for TileDB storage"""
-        chrom = chrom.replace('chr', '')
-        if chrom == 'X':
-            return 23
-        elif chrom == 'Y':
-            return 24
-        elif chrom == 'MT' or chrom == 'M':
-            return 25
-        else:
-            try:
-                return int(chrom)
-            except ValueError:
-                return 999  # Unknown chromosome
+        return CHROM_MAP.get(chrom.replace('chr', ''), UNKNOWN_CHROM)
     
-    def parse_gtf_line(self, line: str) -> Optional[GeneAnnotation]:
-        """Parse a GTF line into GeneAnnotation"""
-        if line.startswith('#') or not line.strip():
-            return None
+    def _aggregate_gene_regions(self, features: pa.Table, gene_map: Dict[str, GeneRegion],
+                                transcript_counts: Dict[str, int]) -> None:
+        """Fold a batch of features into the running gene region and transcript count aggregates"""
+        
+        # Collect genes (first occurrence of each gene name per chromosome wins)
+        genes = features.filter(pc.equal(features['feature_type'], 'gene'))
+        for gene_name, gene_id, chrom, start, end, gene_type, strand, clinical_significance in zip(
+            genes['gene_name'].to_pylist(),
+            genes['gene_id'].to_pylist(),
+            genes['chrom'].to_pylist(),
+            genes['start'].to_pylist(),
+            genes['end'].to_pylist(),
+            genes['gene_type'].to_pylist(),
+            genes['strand'].to_pylist(),
+            self.clinical_significance_column(genes['gene_name']).to_pylist()
+        ):
+            key = f"{gene_name}_{chrom}"
             
-        fields = line.strip().split('\t')
-        if len(fields) < 9:
-            return None
-        
-        chrom, source, feature_type, start, end, score, strand, frame, attributes = fields
-        
-        # Parse attributes
-        attr_dict = {}
-        for attr in attributes.split(';'):
-            if attr.strip():
-                # GTF format: key "value"
-                parts = attr.strip().split(' ', 1)
-                if len(parts) == 2:
-                    key = parts[0]
-                    value = parts[1].strip('"')
-                    attr_dict[key] = value
-        
-        # Only process relevant features
-        allowed_features = ['gene', 'transcript', 'exon', 'CDS', 'five_prime_UTR', 'three_prime_UTR']
-        if feature_type not in allowed_features:
-            return None
-        
-        # Clean chromosome name
-        clean_chrom = chrom.replace('chr', '')
-        
-        return GeneAnnotation(
-            gene_id=attr_dict.get('gene_id', ''),
-            gene_name=attr_dict.get('gene_name', attr_dict.get('gene_id', '')),
-            gene_type=attr_dict.get('gene_type', attr_dict.get('gene_biotype', 'unknown')),
-            chrom=clean_chrom,
-            start=int(start),
-            end=int(end),
-            strand=strand,
-            source=source,
-            transcript_id=attr_dict.get('transcript_id'),
-            exon_number=int(attr_dict.get('exon_number', 0)) if attr_dict.get('exon_number') else None,
-            feature_type=self.normalize_feature_type(feature_type)
-        )
+            if key not in gene_map:
+                gene_map[key] = GeneRegion(
+                    gene_name=gene_name,
+                    gene_id=gene_id,
+                    chrom=chrom,
+                    start=start,
+                    end=end,
+                    gene_type=gene_type,
+                    strand=strand,
+                    transcript_count=0,
+                    clinical_significance=clinical_significance
+                )
+        
+        # Count distinct transcripts per gene in a single hash aggregation. Transcript IDs
+        # are unique per transcript row, so counts from successive batches can be summed.
+        transcripts = features.filter(pc.equal(features['feature_type'], 'transcript'))
+        counts = transcripts.group_by(['gene_name', 'chrom']).aggregate([('transcript_id', 'count_distinct')])
+        for gene_name, chrom, count in zip(
+            counts['gene_name'].to_pylist(),
+            counts['chrom'].to_pylist(),
+            counts['transcript_id_count_distinct'].to_pylist()
+        ):
+            gene_key = f"{gene_name}_{chrom}"
+            transcript_counts[gene_key] = transcript_counts.get(gene_key, 0) + count
     
-    def normalize_feature_type(self, feature_type: str) -> str:
-        """Normalize feature types to standard categories"""
-        mapping = {
-            'five_prime_UTR': 'UTR',
-            'three_prime_UTR': 'UTR',
-            'CDS': 'CDS',
-            'exon': 'exon',
-            'transcript': 'transcript',
-            'gene': 'gene'
-        }
-        return mapping.get(feature_type, feature_type)
+    def clinical_significance_column(self, gene_names) -> pa.ChunkedArray:
+        """Look up clinical significance for a column of gene names (null for non-clinical genes)"""
+        clinical_names = pa.array(list(self.clinical_genes), type=pa.string())
+        clinical_values = pa.array(list(self.clinical_genes.values()), type=pa.string())
+        return pc.take(clinical_values, pc.index_in(gene_names, value_set=clinical_names))
     
-    def extract_gene_regions(self, annotations: List[GeneAnnotation]) -> List[GeneRegion]:
-        """Extract unique gene regions from annotations"""
-        gene_map = {}
-        transcript_counts = {}
-        
-        # First pass: collect genes and count transcripts
-        for annotation in annotations:
-            if annotation.feature_type == 'gene':
-                key = f"{annotation.gene_name}_{annotation.chrom}"
-                
-                if key not in gene_map:
-                    gene_map[key] = GeneRegion(
-                        gene_name=annotation.gene_name,
-                        chrom=annotation.chrom,
-                        start=annotation.start,
-                        end=annotation.end,
-                        gene_type=annotation.gene_type,
-                        strand=annotation.strand,
-                        transcript_count=0,
-                        clinical_significance=self.clinical_genes.get(annotation.gene_name)
-                    )
-            
-            elif annotation.feature_type == 'transcript':
-                gene_key = f"{annotation.gene_name}_{annotation.chrom}"
-                if gene_key not in transcript_counts:
-                    transcript_counts[gene_key] = set()
-                if annotation.transcript_id:
-                    transcript_counts[gene_key].add(annotation.transcript_id)
-        
-        # Update transcript counts
+    def _finalize_gene_regions(self, gene_map: Dict[str, GeneRegion],
+                               transcript_counts: Dict[str, int]) -> List[GeneRegion]:
+        """Attach transcript counts to the aggregated gene regions"""
         for gene_key, gene_region in gene_map.items():
-            gene_region.transcript_count = len(transcript_counts.get(gene_key, set()))
+            gene_region.transcript_count = transcript_counts.get(gene_key, 0)
         
         return list(gene_map.values())
     
-    def process_gtf_file(self, gtf_file: str) -> Tuple[List[GeneRegion], List[GeneAnnotation]]:
-        """Process GTF file and extract gene data"""
+    def _extract_attribute(self, attributes: pa.Array, name: str) -> pa.Array:
+        """Extract a single GTF attribute as a (nullable) string column"""
+        matches = pc.extract_regex(attributes, GTF_ATTRIBUTE_PATTERNS[name])
+        return pc.struct_field(matches, [0])
+    
+    def _process_gtf_batch(self, batch: pa.RecordBatch) -> pa.Table:
+        """Filter a raw GTF record batch and expand its attribute column"""
+        table = pa.Table.from_batches([batch])
+        table = table.filter(pc.is_in(table['feature_type'], pa.array(ALLOWED_FEATURES)))
+        
+        attributes = table['attributes']
+        gene_id = self._extract_attribute(attributes, 'gene_id')
+        gene_name = self._extract_attribute(attributes, 'gene_name')
+        gene_type = self._extract_attribute(attributes, 'gene_type')
+        exon_number = self._extract_attribute(attributes, 'exon_number')
+        
+        # Ensembl GTFs call this attribute gene_biotype; only scan for it when gene_type is missing
+        if gene_type.null_count > 0:
+            gene_type = pc.coalesce(gene_type, self._extract_attribute(attributes, 'gene_biotype'))
+        
+        return pa.table({
+            'gene_id': pc.fill_null(gene_id, ''),
+            'gene_name': pc.coalesce(gene_name, gene_id, pa.scalar('')),
+            'gene_type': pc.coalesce(gene_type, pa.scalar('unknown')),
+            'chrom': pc.replace_substring(table['chrom'], 'chr', ''),
+            'start': table['start'],
+            'end': table['end'],
+            'strand': table['strand'],
+            'source': table['source'],
+            'transcript_id': self._extract_attribute(attributes, 'transcript_id'),
+            'exon_number': pc.cast(exon_number, pa.uint16()),
+            'feature_type': pc.coalesce(
+                pc.take(_FEATURE_MAP_VALUES, pc.index_in(table['feature_type'], value_set=_FEATURE_MAP_KEYS)),
+                table['feature_type']
+            ),
+        })
+    
+    @contextmanager
+    def _open_gtf_stream(self, gtf_file: str) -> Iterator[BinaryIO]:
+        """Open a (possibly gzipped) GTF file as a decompressed binary stream"""
+        if not gtf_file.endswith('.gz'):
+            with open(gtf_file, 'rb', buffering=GTF_READ_BUFFER_SIZE) as f:
+                yield f
+            return
+        
+        if igzip is not None:
+            with igzip.open(gtf_file, 'rb') as f:
+                yield f
+            return
+        
+        pigz = shutil.which('pigz')
+        if pigz:
+            proc = subprocess.Popen([pigz, '-dc', gtf_file], stdout=subprocess.PIPE, bufsize=GTF_READ_BUFFER_SIZE)
+            try:
+                yield proc.stdout
+            finally:
+                proc.stdout.close()
+                returncode = proc.wait()
+            if returncode != 0:
+                raise RuntimeError(f"pigz failed to decompress {gtf_file} (exit code {returncode})")
+            return
+        
+        with gzip.open(gtf_file, 'rb') as f:
+            yield f
+    
+    def iter_gtf_batches(self, gtf_file: str) -> Iterator[pa.Table]:
+        """Stream a GTF file as columnar batches of relevant features"""
+        read_options = pa_csv.ReadOptions(column_names=GTF_COLUMNS, block_size=64 << 20)
+        parse_options = pa_csv.ParseOptions(
+            delimiter='\t',
+            quote_char=False,
+            # Header/comment lines do not have 9 columns; drop them instead of failing
+            invalid_row_handler=lambda row: 'skip'
+        )
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=list(GTF_COLUMN_TYPES),
+            column_types=GTF_COLUMN_TYPES
+        )
+        
+        rows_read = 0
+        batches_read = 0
+        
+        # Decompressed bytes go straight into the Arrow reader (no Python text decoding)
+        with self._open_gtf_stream(gtf_file) as stream, \
+                pa_csv.open_csv(stream, read_options=read_options,
+                                parse_options=parse_options, convert_options=convert_options) as reader:
+            # Attribute extraction runs in Arrow kernels that release the GIL, so raw blocks
+            # are processed on a thread pool while the reader moves on to the next block.
+            # Results are yielded in file order to keep feature IDs stable.
+            with ThreadPoolExecutor(max_workers=GTF_PARSE_WORKERS) as executor:
+                pending = deque()
+                for batch in reader:
+                    rows_read += batch.num_rows
+                    batches_read += 1
+                    pending.append((rows_read, executor.submit(self._process_gtf_batch, batch)))
+                    
+                    if len(pending) >= GTF_PARSE_WORKERS:
+                        processed_rows, future = pending.popleft()
+                        yield future.result()
+                        print(f"  Processed {processed_rows:,} rows...")
+                
+                while pending:
+                    processed_rows, future = pending.popleft()
+                    yield future.result()
+                    print(f"  Processed {processed_rows:,} rows...")
+            
+            if batches_read == 0:
+                yield self._process_gtf_batch(pa.RecordBatch.from_pylist([], schema=reader.schema))
+    
+    def process_gtf_file(self, gtf_file: str) -> List[GeneRegion]:
+        """Process GTF file in a single pass, streaming features to TileDB and extracting gene regions"""
         
         if not os.path.exists(gtf_file):
             raise FileNotFoundError(f"GTF file not found: {gtf_file}")
         
         print(f"📋 Processing GTF file: {gtf_file}")
         
-        annotations = []
-        line_count = 0
+        gene_map = {}
+        transcript_counts = {}
         
-        # Determine if file is compressed
-        opener = gzip.open if gtf_file.endswith('.gz') else open
-        mode = 'rt' if gtf_file.endswith('.gz') else 'r'
+        def aggregated_batches() -> Iterator[pa.Table]:
+            for batch in self.iter_gtf_batches(gtf_file):
+                self._aggregate_gene_regions(batch, gene_map, transcript_counts)
+                yield batch
         
         try:
-            with opener(gtf_file, mode) as f:
-                for line in f:
-                    line_count += 1
-                    
-                    if line_count % 100000 == 0:
-                        print(f"  Processed {line_count:,} lines...")
-                    
-                    annotation = self.parse_gtf_line(line)
-                    if annotation:
-                        annotations.append(annotation)
+            num_features = self.write_gene_features_to_tiledb(aggregated_batches())
             
-            print(f"✅ Parsed {len(annotations):,} annotations from {line_count:,} lines")
+            print(f"✅ Parsed and wrote {num_features:,} annotations")
             
             # Extract gene regions
-            gene_regions = self.extract_gene_regions(annotations)
+            gene_regions = self._finalize_gene_regions(gene_map, transcript_counts)
             print(f"✅ Extracted {len(gene_regions):,} unique gene regions")
             
             # Count clinical genes
             clinical_count = sum(1 for gene in gene_regions if gene.clinical_significance)
             print(f"✅ Found {clinical_count} clinical genes")
             
-            self.stats['total_features'] = len(annotations)
+            self.stats['total_features'] = num_features
             self.stats['genes_processed'] = len(gene_regions)
             self.stats['clinical_genes_found'] = clinical_count
             
-            return gene_regions, annotations
+            return gene_regions
             
         except Exception as e:
             print(f"❌ Error processing GTF file: {e}")
             raise
     
+    def _enumeration_codes(self, array_uri: str, attr_name: str, values) -> Tuple[np.ndarray, bool]:
+        """Encode string values as enumeration codes, extending the enumeration with unseen values
+        
+        Returns the codes and whether the array schema was evolved to add new values.
+        """
+        key = (array_uri, attr_name)
+        if key not in self._enum_vocabularies:
+            # One read-mode open seeds every enumeration of the array
+            with tiledb.open(array_uri, 'r') as A:
+                for i in range(A.schema.nattr):
+                    attr = A.schema.attr(i)
+                    if attr.enum_label is not None:
+                        enum = A.enum(attr.enum_label)
+                        vocabulary = pa.array(enum.values().tolist(), type=pa.string())
+                        self._enum_vocabularies[(array_uri, attr.name)] = (enum, vocabulary, attr.dtype)
+        enum, vocabulary, dtype = self._enum_vocabularies[key]
+        
+        missing = pc.unique(pc.filter(values, pc.invert(pc.is_in(values, value_set=vocabulary))))
+        
+        if len(missing) > 0:
+            enum = enum.extend(missing.to_pylist())
+            evolution = tiledb.ArraySchemaEvolution()
+            evolution.extend_enumeration(enum)
+            evolution.array_evolve(array_uri)
+            vocabulary = pa.concat_arrays([vocabulary, missing])
+            self._enum_vocabularies[key] = (enum, vocabulary, dtype)
+        
+        return pc.index_in(values, value_set=vocabulary).to_numpy().astype(dtype), len(missing) > 0
+    
     def write_gene_regions_to_tiledb(self, gene_regions: List[GeneRegion]) -> None:
         """Write gene regions to TileDB array"""
         
         print(f"📝 Writing {len(gene_regions):,} gene regions to TileDB...")
         
-        # Prepare data arrays
-        chrom_coords = []
-        start_coords = []
-        gene_names = []
-        gene_ids = []
-        gene_types = []
-        ends = []
-        strands = []
-        transcript_counts = []
-        clinical_significances = []
-        is_clinical = []
-        
-        # Sort and deduplicate gene regions to avoid coordinate conflicts
-        sorted_genes = sorted(gene_regions, key=lambda g: (self.chromosome_to_int(g.chrom), g.start, g.gene_name))
-        seen_coords = set()
-        
-        for gene in sorted_genes:
-            chrom_int = self.chromosome_to_int(gene.chrom)
-            coord_key = (chrom_int, gene.start)
-            
-            # Skip duplicates
-            if coord_key in seen_coords:
-                continue
-            seen_coords.add(coord_key)
-            
-            chrom_coords.append(chrom_int)
-            start_coords.append(gene.start)
-            gene_names.append(gene.gene_name)
-            gene_ids.append(f"GENE_{gene.gene_name}_{gene.chrom}")  # Create synthetic ID
-            gene_types.append(gene.gene_type)
-            ends.append(gene.end)
-            strands.append(gene.strand)
-            transcript_counts.append(gene.transcript_count)
-            clinical_significances.append(gene.clinical_significance or '')
-            is_clinical.append(gene.clinical_significance is not None)
-        
-        # Write to TileDB
+        # Prepare data arrays (struct-of-arrays, preallocated)
+        num_genes = len(gene_regions)
+        start_coords = np.empty(num_genes, dtype=np.uint32)
+        gene_names = np.empty(num_genes, dtype=object)
+        gene_ids = np.empty(num_genes, dtype=object)
+        gene_types = np.empty(num_genes, dtype=object)
+        ends = np.empty(num_genes, dtype=np.uint32)
+        strands = np.empty(num_genes, dtype=object)
+        transcript_counts = np.empty(num_genes, dtype=np.uint16)
+        clinical_significances = np.empty(num_genes, dtype=object)
+        is_clinical = np.empty(num_genes, dtype=bool)
+        
+        for i, gene in enumerate(gene_regions):
+            start_coords[i] = gene.start
+            gene_names[i] = gene.gene_name
+            gene_ids[i] = gene.gene_id
+            gene_types[i] = gene.gene_type
+            ends[i] = gene.end
+            strands[i] = gene.strand
+            transcript_counts[i] = gene.transcript_count
+            clinical_significances[i] = gene.clinical_significance or ''
+            is_clinical[i] = gene.clinical_significance is not None
+        
+        chrom_coords = chromosome_codes(pa.array([gene.chrom for gene in gene_regions], type=pa.string()))
+        
+        # Sort by (chrom, start, gene_name) and keep the first gene at each coordinate
+        order = np.lexsort((gene_names.astype(str), start_coords, chrom_coords))
+        sorted_chroms = chrom_coords[order]
+        sorted_starts = start_coords[order]
+        
+        first_at_coord = np.empty(num_genes, dtype=bool)
+        first_at_coord[:1] = True
+        first_at_coord[1:] = (sorted_chroms[1:] != sorted_chroms[:-1]) | (sorted_starts[1:] != sorted_starts[:-1])
+        keep = order[first_at_coord]
+        
+        chrom_coords = chrom_coords[keep]
+        start_coords = start_coords[keep]
+        gene_names = gene_names[keep]
+        gene_ids = gene_ids[keep]
+        gene_types = gene_types[keep]
+        ends = ends[keep]
+        strands = strands[keep]
+        transcript_counts = transcript_counts[keep]
+        clinical_significances = clinical_significances[keep]
+        is_clinical = is_clinical[keep]
+        
+        # Dictionary-encode low-cardinality attributes
+        gene_types, _ = self._enumeration_codes(self.gene_regions_array, 'gene_type', pa.array(gene_types, type=pa.string()))
+        strands, _ = self._enumeration_codes(self.gene_regions_array, 'strand', pa.array(strands, type=pa.string()))
+        clinical_significances, _ = self._enumeration_codes(
+            self.gene_regions_array, 'clinical_significance', pa.array(clinical_significances, type=pa.string())
+        )
+        
+        data = {
+            'gene_name': gene_names,
+            'gene_id': gene_ids,
+            'gene_type': gene_types,
+            'end': ends,
+            'strand': strands,
+            'transcript_count': transcript_counts,
+            'clinical_significance': clinical_significances,
+            'is_clinical': is_clinical
+        }
+        
+        # Write to TileDB (rows are already sorted by chromosome)
         with tiledb.open(self.gene_regions_array, 'w') as A:
-            A[chrom_coords, start_coords] = {
-                'gene_name': gene_names,
-                'gene_id': gene_ids,
-                'gene_type': gene_types,
-                'end': ends,
-                'strand': strands,
-                'transcript_count': transcript_counts,
-                'clinical_significance': clinical_significances,
-                'is_clinical': is_clinical
+            self._write_by_chromosome(A, (chrom_coords, start_coords), data)
+        
+        # Build the point-in-gene interval index from the same columns
+        self._gene_index = GeneIntervalIndex(chrom_coords, start_coords, ends, gene_names, gene_ids)
+        self._gene_index.save(self.gene_index_path)
+    
+    def query_gene_at(self, chrom: str, pos: int) -> List[Dict]:
+        """Find the genes overlapping a genomic position using the gene interval index"""
+        if self._gene_index is None:
+            if not os.path.exists(self.gene_index_path):
+                raise FileNotFoundError(f"Gene interval index not found: {self.gene_index_path}")
+            self._gene_index = GeneIntervalIndex.load(self.gene_index_path)
+        
+        index = self._gene_index
+        return [
+            {
+                'gene_name': str(index.gene_names[i]),
+                'gene_id': str(index.gene_ids[i]),
+                'chrom': chrom.replace('chr', ''),
+                'start': int(index.starts[i]),
+                'end': int(index.ends[i])
             }
+            for i in index.find_overlaps(self.chromosome_to_int(chrom), pos)
+        ]
     
-    def write_gene_features_to_tiledb(self, annotations: List[GeneAnnotation]) -> None:
-        """Write detailed gene features to TileDB array"""
-        
-        print(f"📝 Writing {len(annotations):,} gene features to TileDB...")
-        
-        # Prepare data arrays
-        chrom_coords = []
-        start_coords = []
-        feature_ids = []
-        gene_names = []
-        gene_ids = []
-        transcript_ids = []
-        feature_types = []
-        ends = []
-        strands = []
-        exon_numbers = []
-        sources = []
-        
-        for i, annotation in enumerate(annotations):
-            chrom_int = self.chromosome_to_int(annotation.chrom)
-            
-            chrom_coords.append(chrom_int)
-            start_coords.append(annotation.start)
-            feature_ids.append(i + 1)  # Feature ID (1-based)
-            gene_names.append(annotation.gene_name)
-            gene_ids.append(annotation.gene_id)
-            transcript_ids.append(annotation.transcript_id or '')
-            feature_types.append(annotation.feature_type)
-            ends.append(annotation.end)
-            strands.append(annotation.strand)
-            exon_numbers.append(annotation.exon_number or 0)
-            sources.append(annotation.source)
-        
-        # Write to TileDB in batches
-        batch_size = 50000
-        for i in range(0, len(annotations), batch_size):
-            end_idx = min(i + batch_size, len(annotations))
-            
-            batch_chrom = chrom_coords[i:end_idx]
-            batch_start = start_coords[i:end_idx]
-            batch_feature_id = feature_ids[i:end_idx]
-            
-            with tiledb.open(self.gene_features_array, 'w') as A:
-                A[batch_chrom, batch_start, batch_feature_id] = {
-                    'gene_name': gene_names[i:end_idx],
-                    'gene_id': gene_ids[i:end_idx],
-                    'transcript_id': transcript_ids[i:end_idx],
-                    'feature_type': feature_types[i:end_idx],
-                    'end': ends[i:end_idx],
-                    'strand': strands[i:end_idx],
-                    'exon_number': exon_numbers[i:end_idx],
-                    'source': sources[i:end_idx]
-                }
-            
-            if end_idx < len(annotations):
-                print(f"  Written {end_idx:,} / {len(annotations):,} features...")
+    def _write_by_chromosome(self, A: tiledb.Array, coords: Tuple[np.ndarray, ...],
+                             data: Dict[str, np.ndarray]) -> None:
+        """Write chrom-sorted columns with one TileDB write per chromosome
+        
+        Each write covers a single tile of the chrom dimension, so fragments never
+        straddle chromosomes and consolidate cheaply.
+        """
+        for block in chromosome_slices(coords[0]):
+            A[tuple(c[block] for c in coords)] = {name: values[block] for name, values in data.items()}
+    
+    def _prepare_feature_columns(self, features: pa.Table, first_feature_id: int
+                                 ) -> Tuple[Tuple[np.ndarray, ...], Dict[str, np.ndarray], bool]:
+        """Convert a feature table into TileDB coordinate and attribute columns
+        
+        Returns (coords, attributes, schema_changed); schema_changed is True when an
+        enumeration had to be extended, in which case open writers must be reopened.
+        """
+        num_features = features.num_rows
+        
+        # Prepare data arrays (one NumPy column per attribute, taken from the Arrow table)
+        chrom_coords = chromosome_codes(features['chrom'])
+        start_coords = features['start'].to_numpy()
+        feature_ids = np.arange(first_feature_id, first_feature_id + num_features, dtype=np.uint32)
+        feature_types, feature_types_changed = self._enumeration_codes(
+            self.gene_features_array, 'feature_type', features['feature_type']
+        )
+        strands, strands_changed = self._enumeration_codes(self.gene_features_array, 'strand', features['strand'])
+        sources, sources_changed = self._enumeration_codes(self.gene_features_array, 'source', features['source'])
+        
+        data = {
+            'gene_name': features['gene_name'].to_numpy(zero_copy_only=False),
+            'gene_id': features['gene_id'].to_numpy(zero_copy_only=False),
+            'transcript_id': pc.fill_null(features['transcript_id'], '').to_numpy(zero_copy_only=False),
+            'feature_type': feature_types,
+            'end': features['end'].to_numpy(),
+            'strand': strands,
+            'exon_number': pc.fill_null(features['exon_number'], 0).to_numpy(),
+            'source': sources
+        }
+        
+        # Sort by (chrom, start) so each chromosome is a contiguous write block
+        order = np.lexsort((start_coords, chrom_coords))
+        coords = (chrom_coords[order], start_coords[order], feature_ids[order])
+        data = {name: values[order] for name, values in data.items()}
+        
+        schema_changed = feature_types_changed or strands_changed or sources_changed
+        return coords, data, schema_changed
+    
+    def write_gene_features_to_tiledb(self, features: Union[pa.Table, Iterable[pa.Table]]) -> int:
+        """Write detailed gene features to TileDB array, one batch at a time"""
+        
+        if isinstance(features, pa.Table):
+            print(f"📝 Writing {features.num_rows:,} gene features to TileDB...")
+            features = (pa.Table.from_batches([batch])
+                        for batch in features.to_batches(max_chunksize=FEATURE_WRITE_BATCH_SIZE))
+        
+        num_features = 0
+        A = tiledb.open(self.gene_features_array, 'w')
+        try:
+            for batch in features:
+                coords, data, schema_changed = self._prepare_feature_columns(batch, num_features + 1)  # Feature ID (1-based)
+                if schema_changed:
+                    # Writers are pinned to the schema they were opened with
+                    A.close()
+                    A = tiledb.open(self.gene_features_array, 'w')
+                
+                self._write_by_chromosome(A, coords, data)
+                num_features += batch.num_rows
+        finally:
+            A.close()
+        
+        return num_features
     
     def process_gene_annotations(self, gtf_filename: Optional[str] = None) -> None:
         """Process gene annotations from GTF file to TileDB arrays"""
@@ -448,12 +768,11 @@ class GeneAnnotationProcessor:
             schema = self.create_gene_features_schema()
             tiledb.Array.create(self.gene_features_array, schema)
         
-        # Process GTF file
-        gene_regions, annotations = self.process_gtf_file(gtf_file)
+        # Process GTF file (gene features are written to TileDB as they are parsed)
+        gene_regions = self.process_gtf_file(gtf_file)
         
-        # Write to TileDB
+        # Write gene regions to TileDB
         self.write_gene_regions_to_tiledb(gene_regions)
-        self.write_gene_features_to_tiledb(annotations)
         
         self.stats['processing_time'] = time.time() - start_time
         
@@ -487,6 +806,7 @@ class GeneAnnotationProcessor:
             'gene_features_array': self.gene_features_array,
             'gene_regions_exists': tiledb.object_type(self.gene_regions_array) == "array",
             'gene_features_exists': tiledb.object_type(self.gene_features_array) == "array",
+            'gene_index_exists': os.path.exists(self.gene_index_path),
             'stats': self.stats
         }
         
@@ -11,20 +11,117 @@ import sys
 import gzip
 import time
 import argparse
-from typing import Dict, List, Tuple, Optional
+import functools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass
 from pathlib import Path
 
 import tiledb
 import numpy as np
 
+# rapidgzip decompresses on all cores; fall back to the stdlib decompressor when it is not installed
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+# Raw VCF bytes handed to each parser process at a time (always cut on a line boundary)
+VCF_CHUNK_SIZE = 8 << 20
+VCF_PARSE_WORKERS = os.cpu_count() or 1
+
+# Parser processes are spawned rather than forked: the pool starts while the array writer is
+# open, and forking after a TileDB context exists can deadlock the children
+PROCESS_CONTEXT = multiprocessing.get_context('spawn')
+
+# Rows per TileDB write; each batch becomes one sorted fragment
+WRITE_BATCH_SIZE = 1_000_000
+
+# Minimum seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+# Positions whose allele indices are remembered while streaming a position-sorted VCF
+RECENT_POSITIONS = 16
+
+# Low-cardinality attributes stored as TileDB enumeration codes: attribute (and enumeration) name -> code dtype
+ENUM_ATTRS = {
+    'clinical_significance': np.uint16,
+    'review_status': np.uint8,
+    'molecular_consequence': np.uint16,
+    'origin': np.uint8,
+}
+
+# NumPy dtype of each batch buffer: coordinates, then attributes (object buffers hold strings)
+COORD_DTYPES = {'chrom': np.int8, 'pos': np.uint32, 'allele_idx': np.uint8}
+ATTR_DTYPES = {
+    'variant_id': np.uint32,
+    'variant_accession': object,
+    'ref': object,
+    'alt': object,
+    'clinical_significance': ENUM_ATTRS['clinical_significance'],
+    'review_status': ENUM_ATTRS['review_status'],
+    'condition': object,
+    'gene_symbol': object,
+    'molecular_consequence': ENUM_ATTRS['molecular_consequence'],
+    'origin': ENUM_ATTRS['origin'],
+    'last_evaluated': object,
+}
+
+# Starting vocabularies (display form); values not listed here are appended to the enumerations as they are seen
+CLINICAL_SIGNIFICANCES = [
+    'Pathogenic', 'Likely pathogenic', 'Pathogenic/Likely pathogenic', 'Benign', 'Likely benign',
+    'Benign/Likely benign', 'Uncertain significance', 'Conflicting classifications of pathogenicity',
+    'drug response', 'risk factor', 'association', 'protective', 'Affects', 'other', 'not provided',
+]
+REVIEW_STATUSES = [
+    'practice guideline', 'reviewed by expert panel', 'criteria provided, multiple submitters, no conflicts',
+    'criteria provided, conflicting classifications', 'criteria provided, single submitter',
+    'no assertion criteria provided', 'no classification provided', 'not provided',
+]
+
+# Chromosome name -> TileDB chrom coordinate (1-22, X=23, Y=24, MT=25), with and without the 'chr' prefix
+CHROM_MAP = {**{str(i): i for i in range(1, 23)}, 'X': 23, 'Y': 24, 'MT': 25, 'M': 25}
+CHROM_MAP.update({f'chr{name}': code for name, code in list(CHROM_MAP.items())})
+
+# INFO values repeat across millions of records (a few hundred distinct CLNSIG/CLNREVSTAT
+# values), so each distinct value is normalized once
+@functools.lru_cache(maxsize=8192)
+def normalize_label(value: str) -> str:
+    """Turn a VCF-encoded label (underscores for spaces) into display text"""
+    return value.replace('_', ' ')
+
+@functools.lru_cache(maxsize=8192)
+def normalize_condition(value: str) -> str:
+    """Turn a VCF-encoded CLNDN condition list into display text"""
+    return value.replace('_', ' ').replace('|', '; ')
+
+def significance_category(label: str) -> Optional[str]:
+    """Stats counter a clinical significance label is tallied under (None if it is not counted)"""
+    sig = label.lower()
+    if 'pathogenic' in sig and 'likely' not in sig:
+        return 'pathogenic'
+    elif 'likely pathogenic' in sig:
+        return 'likely_pathogenic'
+    elif 'benign' in sig and 'likely' not in sig:
+        return 'benign'
+    elif 'likely benign' in sig:
+        return 'likely_benign'
+    elif 'uncertain' in sig or 'vus' in sig:
+        return 'vus'
+    elif 'conflicting' in sig:
+        return 'conflicting'
+    return None
+
 @dataclass
 class ClinVarVariant:
     chrom: str
     pos: int
     ref: str
     alt: str
-    variant_id: str
+    variant_id: int          # 0 when the record has no numeric variation ID
+    variant_accession: str   # The original ID when it is not numeric (e.g. RCV accessions), else ''
     clinical_significance: str
     review_status: str
     condition: str
@@ -32,7 +129,20 @@ class ClinVarVariant:
     molecular_consequence: str
     origin: str
     last_evaluated: str
-    url: str
+
+# Column order of ClinVarVariant, used for the per-column parse buffers
+VARIANT_FIELDS = list(ClinVarVariant.__dataclass_fields__)
+
+def cells_sorted(coords: Tuple[np.ndarray, ...]) -> bool:
+    """Whether cells are already in non-decreasing coordinate order (a linear check)"""
+    # Walk the coordinates from most significant: a pair is decided by the first one that differs
+    undecided = np.ones(max(len(coords[0]) - 1, 0), dtype=bool)
+    for c in coords:
+        step = np.diff(c.astype(np.int64))
+        if np.any(undecided & (step < 0)):
+            return False
+        undecided &= step == 0
+    return True
 
 class ClinVarProcessor:
     """Process ClinVar VCF files and create TileDB clinical significance arrays"""
@@ -70,123 +180,189 @@ class ClinVarProcessor:
             tiledb.Dim(name="allele_idx", domain=(0, 100), tile=10, dtype=np.uint8)  # Max 100 alt alleles per position
         ]
         
-        # Attributes: ClinVar data
+        # Low-cardinality labels are dictionary-encoded; readers get the strings back transparently
+        enums = [
+            tiledb.Enumeration("clinical_significance", False, CLINICAL_SIGNIFICANCES),
+            tiledb.Enumeration("review_status", False, REVIEW_STATUSES),
+            tiledb.Enumeration("molecular_consequence", False, dtype=str),
+            tiledb.Enumeration("origin", False, dtype=str),
+        ]
+        
+        # Attributes: ClinVar data, variable-length UTF-8 strings or enumeration codes
         attrs = [
-            tiledb.Attr(name="variant_id", dtype='U50'),  # ClinVar variation ID
-            tiledb.Attr(name="ref", dtype='U200'),        # Reference allele
-            tiledb.Attr(name="alt", dtype='U200'),        # Alternate allele
-            tiledb.Attr(name="clinical_significance", dtype='U100'),  # Pathogenic, Benign, VUS, etc.
-            tiledb.Attr(name="review_status", dtype='U100'),          # Review confidence
-            tiledb.Attr(name="condition", dtype='U500'),              # Associated condition/disease
-            tiledb.Attr(name="gene_symbol", dtype='U50'),             # Gene symbol
-            tiledb.Attr(name="molecular_consequence", dtype='U100'),   # Consequence type
-            tiledb.Attr(name="origin", dtype='U50'),                  # Germline, somatic, etc.
-            tiledb.Attr(name="last_evaluated", dtype='U20'),          # Last evaluation date
-            tiledb.Attr(name="url", dtype='U200'),                    # ClinVar URL
+            tiledb.Attr(name="variant_id", dtype=np.uint32),       # ClinVar variation ID (0 if not numeric)
+            tiledb.Attr(name="variant_accession", dtype=str),      # Non-numeric IDs (RCV...), else empty
+            tiledb.Attr(name="ref", dtype=str),                    # Reference allele
+            tiledb.Attr(name="alt", dtype=str),                    # Alternate allele
+            tiledb.Attr(name="clinical_significance", dtype=ENUM_ATTRS['clinical_significance'],
+                        enum_label="clinical_significance"),       # Pathogenic, Benign, VUS, etc.
+            tiledb.Attr(name="review_status", dtype=ENUM_ATTRS['review_status'],
+                        enum_label="review_status"),               # Review confidence
+            tiledb.Attr(name="condition", dtype=str),              # Associated condition/disease
+            tiledb.Attr(name="gene_symbol", dtype=str),            # Gene symbol
+            tiledb.Attr(name="molecular_consequence", dtype=ENUM_ATTRS['molecular_consequence'],
+                        enum_label="molecular_consequence"),       # Consequence type
+            tiledb.Attr(name="origin", dtype=ENUM_ATTRS['origin'],
+                        enum_label="origin"),                      # Germline, somatic, etc.
+            tiledb.Attr(name="last_evaluated", dtype=str),         # Last evaluation date
         ]
         
         # Create sparse array schema
         domain = tiledb.Domain(*dims)
-        schema = tiledb.ArraySchema(domain=domain, sparse=True, attrs=attrs)
+        schema = tiledb.ArraySchema(domain=domain, sparse=True, attrs=attrs, enums=enums)
         
         return schema
     
     def chromosome_to_int(self, chrom: str) -> Optional[int]:
         """Convert chromosome string to integer for TileDB storage"""
-        chrom = chrom.replace('chr', '')
-        
-        # Skip non-standard chromosomes (scaffolds, patches, etc.)
-        if chrom.startswith('NT_') or chrom.startswith('NW_') or chrom.startswith('GL'):
-            return None
-        
-        if chrom == 'X':
-            return 23
-        elif chrom == 'Y':
-            return 24
-        elif chrom == 'MT' or chrom == 'M':
-            return 25
-        else:
-            try:
-                chrom_int = int(chrom)
-                if 1 <= chrom_int <= 22:
-                    return chrom_int
-                else:
-                    return None  # Skip invalid chromosome numbers
-            except ValueError:
-                return None  # Skip unparseable chromosome names
+        # Non-standard chromosomes (scaffolds, patches, etc.) are not in the map
+        return CHROM_MAP.get(chrom)
     
-    def parse_vcf_line(self, line: str) -> Optional[List[ClinVarVariant]]:
-        """Parse a ClinVar VCF line and extract clinical significance data"""
+    def _parse_vcf_record(self, line: str, columns: Dict[str, list]) -> int:
+        """Parse a ClinVar VCF line, appending one row per alt allele to the column lists"""
         if line.startswith('#'):
-            return None
+            return 0
             
         fields = line.strip().split('\t')
         if len(fields) < 8:
-            return None
+            return 0
         
         chrom = fields[0]
         pos = int(fields[1])
-        variant_id = fields[2]  # ClinVar variation ID
         ref = fields[3]
-        alts = fields[4].split(',')  # Handle multi-allelic sites
+        alt_field = fields[4]
         info = fields[7]
         
-        # Parse INFO field for ClinVar data
+        # ClinVar variation IDs are integers; anything else is kept as an accession string
+        if fields[2].isdecimal():
+            variant_id = int(fields[2])
+            variant_accession = ''
+        else:
+            variant_id = 0
+            variant_accession = fields[2]
+        
+        # Parse INFO field for ClinVar data in one split; partition returns the key and value
+        # without building a list per item (flags map to '', and only key=value items are read)
         info_dict = {}
         for item in info.split(';'):
-            if '=' in item:
-                key, value = item.split('=', 1)
-                info_dict[key] = value
-        
-        variants = []
+            key, _, value = item.partition('=')
+            info_dict[key] = value
         
         try:
             # Extract ClinVar-specific fields
             clinical_significance = info_dict.get('CLNSIG', 'not_provided')
-            review_status = info_dict.get('CLNREVSTAT', 'not_provided')
-            condition = info_dict.get('CLNDN', 'not_provided')
-            gene_symbol = info_dict.get('GENEINFO', '').split(':')[0] if info_dict.get('GENEINFO') else 'unknown'
-            molecular_consequence = info_dict.get('MC', 'unknown')
-            origin = info_dict.get('ORIGIN', 'unknown')
-            
-            # ClinVar URL
-            url = f"https://www.ncbi.nlm.nih.gov/clinvar/variation/{variant_id}/"
+            review_status = normalize_label(info_dict.get('CLNREVSTAT', 'not_provided'))
+            condition = normalize_condition(info_dict.get('CLNDN', 'not_provided'))
+            gene_symbol = sys.intern(info_dict['GENEINFO'].split(':', 1)[0]) if info_dict.get('GENEINFO') else 'unknown'
+            molecular_consequence = normalize_label(info_dict.get('MC', 'unknown'))
+            origin = normalize_label(info_dict.get('ORIGIN', 'unknown'))
             
             # Last evaluated date (try multiple fields)
             last_evaluated = info_dict.get('CLNHGVS', 'unknown')[:10]  # Extract date if present
             
-            # Create a variant for each alt allele
-            for i, alt in enumerate(alts):
-                # Handle multi-allelic clinical significance
-                if ',' in clinical_significance:
-                    sig_parts = clinical_significance.split(',')
-                    sig = sig_parts[i] if i < len(sig_parts) else sig_parts[0]
-                else:
-                    sig = clinical_significance
-                
-                variants.append(ClinVarVariant(
-                    chrom=chrom,
-                    pos=pos,
-                    ref=ref,
-                    alt=alt,
-                    variant_id=variant_id,
-                    clinical_significance=sig.replace('_', ' '),
-                    review_status=review_status.replace('_', ' '),
-                    condition=condition.replace('_', ' ').replace('|', '; '),
-                    gene_symbol=gene_symbol,
-                    molecular_consequence=molecular_consequence.replace('_', ' '),
-                    origin=origin.replace('_', ' '),
-                    last_evaluated=last_evaluated,
-                    url=url
-                ))
-            
-            return variants if variants else None
+            # Handle multi-allelic sites and their per-allele clinical significance
+            # (single-allele records, the vast majority, skip the list building)
+            if ',' in alt_field:
+                alts = alt_field.split(',')
+                sig_parts = clinical_significance.split(',')
+                sigs = [sig_parts[i] if i < len(sig_parts) else sig_parts[0] for i in range(len(alts))]
+            else:
+                alts = (alt_field,)
+                sigs = (clinical_significance.split(',', 1)[0] if ',' in clinical_significance else clinical_significance,)
             
         except (ValueError, KeyError, IndexError) as e:
             print(f"Warning: Could not parse ClinVar variant at {chrom}:{pos} - {e}")
+            return 0
+        
+        # Append a row for each alt allele
+        for alt, sig in zip(alts, sigs):
+            columns['chrom'].append(chrom)
+            columns['pos'].append(pos)
+            columns['ref'].append(ref)
+            columns['alt'].append(alt)
+            columns['variant_id'].append(variant_id)
+            columns['variant_accession'].append(variant_accession)
+            columns['clinical_significance'].append(normalize_label(sig))
+            columns['review_status'].append(review_status)
+            columns['condition'].append(condition)
+            columns['gene_symbol'].append(gene_symbol)
+            columns['molecular_consequence'].append(molecular_consequence)
+            columns['origin'].append(origin)
+            columns['last_evaluated'].append(last_evaluated)
+        
+        return len(alts)
+    
+    def parse_vcf_line(self, line: str) -> Optional[List[ClinVarVariant]]:
+        """Parse a ClinVar VCF line and extract clinical significance data"""
+        columns = {field: [] for field in VARIANT_FIELDS}
+        if not self._parse_vcf_record(line, columns):
             return None
+        
+        return [ClinVarVariant(*row) for row in zip(*columns.values())]
+    
+    def parse_vcf_lines(self, lines: List[str]) -> Dict[str, list]:
+        """Parse a chunk of ClinVar VCF lines into column lists, keeping standard chromosomes only"""
+        columns = {field: [] for field in VARIANT_FIELDS}
+        parse_record = self._parse_vcf_record
+        for line in lines:
+            # Skip headers and non-standard chromosomes (scaffolds, patches, etc.) before parsing
+            if line[:line.find('\t')] in CHROM_MAP:
+                parse_record(line, columns)
+        
+        # Convert chromosomes to integers
+        columns['chrom'] = [CHROM_MAP[chrom] for chrom in columns['chrom']]
+        
+        return columns
+    
+    def parse_vcf_chunk(self, chunk: bytes) -> Tuple[int, Dict[str, list]]:
+        """Decode and parse a raw block of whole VCF lines, returning (line count, columns)"""
+        lines = chunk.decode('utf-8').split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return len(lines), self.parse_vcf_lines(lines)
+    
+    def _iter_vcf_chunks(self, f: BinaryIO) -> Iterator[bytes]:
+        """Read the decompressed VCF as raw blocks that end on a line boundary"""
+        while True:
+            block = f.read(VCF_CHUNK_SIZE)
+            if not block:
+                break
+            
+            # Finish the block's last line with readline (a memchr scan of the reader's
+            # buffer) instead of cutting and re-joining blocks, which copied each block twice
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            yield block
+    
+    def _iter_parsed_chunks(self, f: BinaryIO) -> Iterator[Tuple[int, Dict[str, list]]]:
+        """Parse the VCF stream in line-aligned chunks on a process pool, yielding (line count, columns) in file order"""
+        # The main process only moves raw bytes; decoding and line splitting happen in the workers
+        chunks = self._iter_vcf_chunks(f)
+        
+        if VCF_PARSE_WORKERS <= 1:
+            for chunk in chunks:
+                yield self.parse_vcf_chunk(chunk)
+            return
+        
+        with ProcessPoolExecutor(max_workers=VCF_PARSE_WORKERS, mp_context=PROCESS_CONTEXT) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(self.parse_vcf_chunk, chunk))
+                
+                # Keep every worker busy without reading the whole file ahead
+                if len(pending) >= 2 * VCF_PARSE_WORKERS:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+    
+    def _open_vcf(self, vcf_file: str) -> BinaryIO:
+        """Open the gzipped ClinVar VCF as a decompressed binary stream"""
+        if rapidgzip is not None:
+            return rapidgzip.open(vcf_file, parallelization=os.cpu_count() or 1)
+        return gzip.open(vcf_file, 'rb')
     
-    def process_clinvar_vcf(self, batch_size: int = 10000) -> int:
+    def process_clinvar_vcf(self, batch_size: int = WRITE_BATCH_SIZE) -> int:
         """Process ClinVar VCF file and populate TileDB array"""
         
         vcf_file = os.path.join(self.clinvar_dir, 'clinvar.vcf.gz')
@@ -200,75 +376,93 @@ class ClinVarProcessor:
         
         variants_processed = 0
         lines_processed = 0
+        last_progress = time.monotonic()
         
-        # Track allele indices per position
-        position_allele_map = {}
+        # Allele indices of the most recently seen positions. The VCF is position-sorted, so
+        # all alleles of a site arrive together and older positions can be forgotten.
+        recent_positions = {}
         
-        # Prepare batch data for TileDB insertion
-        batch_data = []
+        # Preallocated batch buffers for TileDB insertion (one array per dimension/attribute),
+        # filled chunk by chunk and reused for every batch
+        batch = {name: np.empty(batch_size, dtype=dtype) for name, dtype in {**COORD_DTYPES, **ATTR_DTYPES}.items()}
+        batch_pos = 0
         
         try:
-            with gzip.open(vcf_file, 'rt') as f:
-                for line_num, line in enumerate(f):
-                    lines_processed += 1
-                    if line_num % 50000 == 0 and line_num > 0:
-                        print(f"  Processed {line_num:,} lines, {variants_processed:,} variants...")
+            # One writer for the whole ingest; each batch is a single large write through it
+            # (reopened whenever an enumeration is extended)
+            with self._open_vcf(vcf_file) as f:
+                clinvar_array = tiledb.open(self.clinvar_array, 'w')
+                try:
+                    # Label -> code for each enumeration, starting from what the array already holds
+                    self.label_codes = {
+                        name: {label: code for code, label in enumerate(clinvar_array.enum(name).values().tolist())}
+                        for name in ENUM_ATTRS
+                    }
+                    self.enum_sizes = {name: len(codes) for name, codes in self.label_codes.items()}
                     
-                    variants = self.parse_vcf_line(line)
-                    if variants is None:
-                        continue
-                    
-                    # Process each variant
-                    for variant in variants:
-                        # Convert chromosome to integer
-                        chrom_int = self.chromosome_to_int(variant.chrom)
-                        
-                        # Skip non-standard chromosomes
-                        if chrom_int is None:
-                            continue
+                    # Lines are parsed in worker processes; allele indices are assigned here, in file order
+                    for num_lines, columns in self._iter_parsed_chunks(f):
+                        lines_processed += num_lines
                         
-                        # Create unique allele index for this position
-                        pos_key = (chrom_int, variant.pos)
-                        if pos_key not in position_allele_map:
-                            position_allele_map[pos_key] = {}
+                        # Create unique allele index for each position
+                        allele_idx = columns['allele_idx'] = []
+                        repeated = []
+                        for row, (chrom_int, pos, ref, alt) in enumerate(zip(columns['chrom'], columns['pos'], columns['ref'], columns['alt'])):
+                            pos_key = (chrom_int, pos)
+                            alleles = recent_positions.get(pos_key)
+                            if alleles is None:
+                                alleles = recent_positions[pos_key] = {}
+                                if len(recent_positions) > RECENT_POSITIONS:
+                                    del recent_positions[next(iter(recent_positions))]
+                            
+                            # A repeated ref>alt keeps its first row only, since a second cell would
+                            # duplicate its coordinates and TileDB rejects the whole write
+                            allele_key = (ref, alt)
+                            idx = alleles.get(allele_key)
+                            if idx is None:
+                                idx = alleles[allele_key] = len(alleles)
+                            else:
+                                repeated.append(row)
+                            
+                            allele_idx.append(idx)
                         
-                        allele_key = f"{variant.ref}>{variant.alt}"
-                        if allele_key not in position_allele_map[pos_key]:
-                            position_allele_map[pos_key][allele_key] = len(position_allele_map[pos_key])
+                        # Encode the chunk's labels, then convert every column once
+                        for name in ENUM_ATTRS:
+                            columns[name] = self._encode_labels(name, columns[name])
+                        columns = {name: np.asarray(columns[name], dtype=buffer.dtype) for name, buffer in batch.items()}
                         
-                        allele_idx = position_allele_map[pos_key][allele_key]
+                        if repeated:
+                            print(f"Warning: Dropped {len(repeated):,} repeated alleles (first at chr{columns['chrom'][repeated[0]]}:{columns['pos'][repeated[0]]})")
+                            keep = np.ones(len(allele_idx), dtype=bool)
+                            keep[repeated] = False
+                            columns = {name: values[keep] for name, values in columns.items()}
                         
-                        # Add to batch with 3D coordinates
-                        batch_data.append({
-                            'coords': (chrom_int, variant.pos, allele_idx),
-                            'data': variant
-                        })
+                        num_variants = len(columns['allele_idx'])
+                        variants_processed += num_variants
+                        self._count_significance(columns['clinical_significance'])
                         
-                        variants_processed += 1
+                        # Copy the chunk into the batch buffers, writing each batch as it fills
+                        start = 0
+                        while start < num_variants:
+                            take = min(num_variants - start, batch_size - batch_pos)
+                            for name, buffer in batch.items():
+                                buffer[batch_pos:batch_pos + take] = columns[name][start:start + take]
+                            batch_pos += take
+                            start += take
+                            
+                            if batch_pos == batch_size:
+                                clinvar_array = self._write_batch_to_tiledb(clinvar_array, batch, batch_pos)
+                                batch_pos = 0
                         
-                        # Update statistics
-                        sig = variant.clinical_significance.lower()
-                        if 'pathogenic' in sig and 'likely' not in sig:
-                            self.stats['pathogenic'] += 1
-                        elif 'likely pathogenic' in sig:
-                            self.stats['likely_pathogenic'] += 1
-                        elif 'benign' in sig and 'likely' not in sig:
-                            self.stats['benign'] += 1
-                        elif 'likely benign' in sig:
-                            self.stats['likely_benign'] += 1
-                        elif 'uncertain' in sig or 'vus' in sig:
-                            self.stats['vus'] += 1
-                        elif 'conflicting' in sig:
-                            self.stats['conflicting'] += 1
+                        now = time.monotonic()
+                        if now - last_progress >= PROGRESS_INTERVAL:
+                            print(f"  Processed {lines_processed:,} lines, {variants_processed:,} variants...")
+                            last_progress = now
                     
-                    # Write batch when it reaches batch_size
-                    if len(batch_data) >= batch_size:
-                        self._write_batch_to_tiledb(batch_data)
-                        batch_data = []
-                
-                # Write remaining batch
-                if batch_data:
-                    self._write_batch_to_tiledb(batch_data)
+                    # Write remaining batch
+                    clinvar_array = self._write_batch_to_tiledb(clinvar_array, batch, batch_pos)
+                finally:
+                    clinvar_array.close()
             
             print(f"✅ ClinVar processing: {variants_processed:,} variants")
             print(f"  Total lines processed: {lines_processed:,}")
@@ -280,53 +474,91 @@ class ClinVarProcessor:
         
         return variants_processed
     
-    def _write_batch_to_tiledb(self, batch_data: List[Dict]) -> None:
-        """Write a batch of ClinVar variants to TileDB array"""
-        if not batch_data:
-            return
+    def _encode_labels(self, name: str, labels: list) -> np.ndarray:
+        """Map label strings to enumeration codes, assigning new codes to labels not seen before"""
+        codes = self.label_codes[name]
+        for label in dict.fromkeys(labels):
+            if label not in codes:
+                codes[label] = len(codes)
         
-        # Prepare coordinate and attribute arrays
-        coords = [item['coords'] for item in batch_data]
-        
-        # Separate coordinates into dimensions
-        chrom_coords = np.array([c[0] for c in coords], dtype=np.int8)
-        pos_coords = np.array([c[1] for c in coords], dtype=np.uint32)
-        allele_idx_coords = np.array([c[2] for c in coords], dtype=np.uint8)
-        
-        # Prepare attribute data
-        variant_id_data = np.array([item['data'].variant_id for item in batch_data], dtype='U50')
-        ref_data = np.array([item['data'].ref for item in batch_data], dtype='U200')
-        alt_data = np.array([item['data'].alt for item in batch_data], dtype='U200')
-        clinical_significance_data = np.array([item['data'].clinical_significance for item in batch_data], dtype='U100')
-        review_status_data = np.array([item['data'].review_status for item in batch_data], dtype='U100')
-        condition_data = np.array([item['data'].condition for item in batch_data], dtype='U500')
-        gene_symbol_data = np.array([item['data'].gene_symbol for item in batch_data], dtype='U50')
-        molecular_consequence_data = np.array([item['data'].molecular_consequence for item in batch_data], dtype='U100')
-        origin_data = np.array([item['data'].origin for item in batch_data], dtype='U50')
-        last_evaluated_data = np.array([item['data'].last_evaluated for item in batch_data], dtype='U20')
-        url_data = np.array([item['data'].url for item in batch_data], dtype='U200')
-        
-        # Write to TileDB
+        dtype = ENUM_ATTRS[name]
+        if len(codes) > np.iinfo(dtype).max + 1:
+            raise ValueError(f"Too many distinct {name} values for {np.dtype(dtype).name} codes: {len(codes):,}")
+        
+        return np.fromiter(map(codes.__getitem__, labels), dtype=dtype, count=len(labels))
+    
+    def _count_significance(self, codes: np.ndarray) -> None:
+        """Add a batch of clinical_significance codes to the stats counters"""
+        # One histogram over the codes, then one classification per distinct label
+        vocabulary = self.label_codes['clinical_significance']
+        counts = np.bincount(codes, minlength=len(vocabulary))
+        for label, code in vocabulary.items():
+            category = significance_category(label)
+            if category is not None:
+                self.stats[category] += int(counts[code])
+    
+    def _extend_enumerations(self) -> bool:
+        """Append the labels assigned codes since the last call to the array's enumerations
+        
+        Returns whether the schema was evolved; open writers must then be reopened.
+        """
+        new_labels = {
+            name: list(codes)[self.enum_sizes[name]:]
+            for name, codes in self.label_codes.items()
+            if len(codes) > self.enum_sizes[name]
+        }
+        if not new_labels:
+            return False
+        
+        with tiledb.open(self.clinvar_array, 'r') as A:
+            enums = {name: A.enum(A.attr(name).enum_label) for name in new_labels}
+        
+        evolution = tiledb.ArraySchemaEvolution()
+        for name, labels in new_labels.items():
+            evolution.extend_enumeration(enums[name].extend(labels))
+        evolution.array_evolve(self.clinvar_array)
+        
+        for name in new_labels:
+            self.enum_sizes[name] = len(self.label_codes[name])
+        return True
+    
+    def _write_batch_to_tiledb(self, A: tiledb.Array, batch: Dict[str, np.ndarray], num_rows: int) -> tiledb.Array:
+        """Write the first num_rows rows of the batch buffers to TileDB array
+        
+        Returns the writer to use for later batches (a new one if the schema was evolved).
+        """
+        if num_rows == 0:
+            return A
+        
+        # Every code in the batch must have a label before its fragment is committed
+        if self._extend_enumerations():
+            # Writers are pinned to the schema they were opened with
+            A.close()
+            A = tiledb.open(self.clinvar_array, 'w')
+        
+        # Views of the filled part of the buffers. TileDB copies the cells while the write
+        # runs and the write finishes before __setitem__ returns, so the buffers can be
+        # refilled as soon as this returns.
+        coords = tuple(batch[name][:num_rows] for name in COORD_DTYPES)
+        data = {name: batch[name][:num_rows] for name in ATTR_DTYPES}
+        
+        # Position-sorted input is usually in (chrom, pos, allele_idx) order already; only unordered batches are sorted
+        if not cells_sorted(coords):
+            order = np.lexsort(coords[::-1])
+            coords = tuple(c[order] for c in coords)
+            data = {name: values[order] for name, values in data.items()}
+        chrom_coords, pos_coords, allele_idx_coords = coords
+        
+        # Write to TileDB through the already open writer. A failed write stops the ingest:
+        # skipping it would silently lose up to a whole batch of already counted variants.
         try:
-            with tiledb.open(self.clinvar_array, 'w') as A:
-                A[chrom_coords, pos_coords, allele_idx_coords] = {
-                    'variant_id': variant_id_data,
-                    'ref': ref_data,
-                    'alt': alt_data,
-                    'clinical_significance': clinical_significance_data,
-                    'review_status': review_status_data,
-                    'condition': condition_data,
-                    'gene_symbol': gene_symbol_data,
-                    'molecular_consequence': molecular_consequence_data,
-                    'origin': origin_data,
-                    'last_evaluated': last_evaluated_data,
-                    'url': url_data
-                }
+            A[chrom_coords, pos_coords, allele_idx_coords] = data
         except Exception as e:
             print(f"  TileDB write error: {e}")
             print(f"  Batch size: {len(chrom_coords)}")
-            print(f"  Skipping this batch and continuing...")
-            return
+            raise
+        
+        return A
     
     def process_all_clinvar_data(self) -> None:
         """Process all ClinVar data"""
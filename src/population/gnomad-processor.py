@@ -12,13 +12,65 @@ import gzip
 import json
 import time
 import argparse
-from typing import Dict, List, Tuple, Optional
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass
 from pathlib import Path
 
 import tiledb
 import numpy as np
 
+# rapidgzip inflates the BGZF blocks on all cores; fall back to the stdlib decompressor when it is not installed
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+# Decompressed bytes handed to each parser process at a time (gnomAD lines run to ~10 KB);
+# one core is left for decompression and writes
+VCF_CHUNK_SIZE = 16 << 20
+VCF_PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Chromosome files processed at once (each is an independent VCF); the cores are shared out
+# between them for parsing, bounded so concurrent writers do not saturate the disk
+CHROMOSOME_WORKERS = min(8, os.cpu_count() or 1)
+
+# Worker processes (chromosome and parse pools) are spawned rather than forked: the parent already
+# holds a TileDB context, and the parse pool starts while the array writer is open, so a fork can
+# deadlock the children
+PROCESS_CONTEXT = multiprocessing.get_context('spawn')
+
+# INFO fields read from each gnomAD record (gnomAD lines carry hundreds of others)
+INFO_FIELDS = (
+    'AF_joint', 'AF_joint_afr', 'AF_joint_amr', 'AF_joint_asj', 'AF_joint_eas', 'AF_joint_fin',
+    'AF_joint_nfe', 'AF_joint_oth', 'AC_joint', 'AN_joint', 'nhomalt_joint', 'faf95_joint',
+)
+
+# (key, match at the start of INFO, match anywhere else) for each INFO field that is read
+_INFO_NEEDLES = tuple((key, f'{key}=', f';{key}=') for key in INFO_FIELDS)
+
+# Chromosome name -> TileDB chrom coordinate (1-22, X=23, Y=24, MT=25), with and without the 'chr' prefix
+CHROM_MAP = {**{str(i): i for i in range(1, 23)}, 'X': 23, 'Y': 24, 'MT': 25, 'M': 25}
+CHROM_MAP.update({f'chr{name}': code for name, code in list(CHROM_MAP.items())})
+
+# Global allele frequency above which a variant counts as common
+COMMON_AF_THRESHOLD = 0.01
+
+# Allele frequencies are stored as uint16 codes on a log10 scale: code 0 is AF 0 and codes
+# 1-65535 span AF 1e-8 to 1 (~0.03% relative error), so singleton frequencies stay nonzero
+AF_FIELDS = ('af_global', 'af_afr', 'af_amr', 'af_asj', 'af_eas', 'af_fin', 'af_nfe', 'af_oth', 'faf95_global')
+AF_LOG10_MIN = -8.0
+AF_CODE_MAX = 65535
+
+# Repeated ref>alt rows at a position are dropped before writing, so allele indices are unique
+# per position and TileDB's duplicate-coordinate check is skipped
+WRITE_CONFIG = {'sm.check_coord_dups': 'false'}
+
+# Full batches queued for the background TileDB writer before the parser waits for it
+WRITE_QUEUE_DEPTH = 2
+
 @dataclass
 class PopulationFrequency:
     chrom: str
@@ -39,6 +91,131 @@ class PopulationFrequency:
     faf95_global: float
     is_common: bool
 
+# Column order of PopulationFrequency, used for the per-column parse buffers
+VARIANT_FIELDS = list(PopulationFrequency.__dataclass_fields__)
+
+# NumPy dtype of each batch column: coordinates, then attributes (object columns hold the parsed allele strings)
+BATCH_DTYPES = {
+    'chrom': np.int8,
+    'pos': np.uint32,
+    'allele_idx': np.uint16,
+    'ref': object,
+    'alt': object,
+    'af_global': np.uint16,
+    'af_afr': np.uint16,
+    'af_amr': np.uint16,
+    'af_asj': np.uint16,
+    'af_eas': np.uint16,
+    'af_fin': np.uint16,
+    'af_nfe': np.uint16,
+    'af_oth': np.uint16,
+    'ac_global': np.uint32,
+    'an_global': np.uint32,
+    'nhomalt_global': np.uint32,
+    'faf95_global': np.uint16,
+    'is_common': bool,
+}
+
+# Compression pipelines: shuffled zstd for frequencies/counts, delta coding for sorted positions
+STRING_FILTERS = tiledb.FilterList([tiledb.ZstdFilter(level=9)])
+NUMERIC_FILTERS = tiledb.FilterList([tiledb.BitShuffleFilter(), tiledb.ZstdFilter(level=5)])
+POSITION_FILTERS = tiledb.FilterList([tiledb.DoubleDeltaFilter(), tiledb.ZstdFilter(level=3)])
+CODE_FILTERS = tiledb.FilterList([tiledb.BitWidthReductionFilter(), tiledb.ZstdFilter(level=5)])
+OFFSETS_FILTERS = tiledb.FilterList([tiledb.DoubleDeltaFilter(), tiledb.ZstdFilter(level=-1)])
+
+# Cells per data tile of the population frequency array
+POP_FREQ_CAPACITY = 100_000
+
+def extract_info_fields(info: str) -> Dict[str, str]:
+    """Pull the INFO_FIELDS values out of a VCF INFO string without splitting the other entries"""
+    values = {}
+    for key, head, needle in _INFO_NEEDLES:
+        if info.startswith(head):
+            start = len(head)
+        else:
+            start = info.find(needle)
+            if start < 0:
+                continue
+            start += len(needle)
+        end = info.find(';', start)
+        values[key] = info[start:end] if end >= 0 else info[start:].rstrip()
+    return values
+
+def parse_allele_values(value: Optional[str], num_alts: int, parse_func=float, default=0.0) -> list:
+    """Parse a per-allele INFO value: comma-separated for multi-allelic sites, a single value applies to every alt"""
+    if value is None:
+        return [default] * num_alts
+    if ',' in value:
+        return list(map(parse_func, value.split(',')))
+    return [parse_func(value)] * num_alts
+
+def encode_allele_frequencies(values) -> np.ndarray:
+    """Quantize allele frequencies in [0, 1] to uint16 log-scale codes"""
+    af = np.clip(np.nan_to_num(np.asarray(values, dtype=np.float64)), 0.0, 1.0)
+    codes = np.zeros(af.shape, dtype=np.uint16)
+    present = af > 0.0
+    scaled = (np.log10(np.maximum(af[present], 10.0 ** AF_LOG10_MIN)) - AF_LOG10_MIN) / -AF_LOG10_MIN
+    codes[present] = np.rint(scaled * (AF_CODE_MAX - 1)) + 1
+    return codes
+
+class BatchBuffers:
+    """Preallocated column arrays for one TileDB write batch, filled from the front up to cursor"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.cursor = 0
+        self.columns = {name: np.empty(size, dtype=dtype) for name, dtype in BATCH_DTYPES.items()}
+    
+    def fill(self, columns: Dict[str, np.ndarray], start: int) -> int:
+        """Copy rows from start onwards into the free space, returning how many rows fit"""
+        take = min(len(columns['pos']) - start, self.size - self.cursor)
+        for name, buffer in self.columns.items():
+            buffer[self.cursor:self.cursor + take] = columns[name][start:start + take]
+        self.cursor += take
+        return take
+    
+    def is_full(self) -> bool:
+        return self.cursor == self.size
+    
+    def view(self) -> Dict[str, np.ndarray]:
+        """The filled rows of every column (views, valid until the buffers are refilled)"""
+        return {name: buffer[:self.cursor] for name, buffer in self.columns.items()}
+
+class BatchWriter:
+    """Writes full batch buffers on a background thread, handing back empty buffers to fill meanwhile"""
+    
+    def __init__(self, write_batch, batch_size: int, depth: int = WRITE_QUEUE_DEPTH):
+        self.write_batch = write_batch
+        self.executor = ThreadPoolExecutor(max_workers=1)  # One thread keeps the writes in order
+        self.pending = deque()
+        self.free = [BatchBuffers(batch_size) for _ in range(depth)]
+        self.buffers = BatchBuffers(batch_size)
+    
+    def submit(self) -> BatchBuffers:
+        """Queue the current buffers for writing and return the (empty) buffers to fill next"""
+        self.pending.append((self.buffers, self.executor.submit(self.write_batch, self.buffers)))
+        if not self.free:
+            buffers, future = self.pending.popleft()
+            future.result()
+            self.free.append(buffers)
+        self.buffers = self.free.pop()
+        return self.buffers
+    
+    def close(self) -> None:
+        """Wait for every queued write to finish"""
+        try:
+            while self.pending:
+                _, future = self.pending.popleft()
+                future.result()
+        finally:
+            self.executor.shutdown()
+    
+    def __enter__(self) -> 'BatchWriter':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 class GnomadProcessor:
     """Process gnomAD VCF files and create TileDB population frequency arrays"""
     
@@ -67,59 +244,60 @@ class GnomadProcessor:
         
         # Dimensions: chromosome, position, and allele index for multi-allelic sites
         dims = [
-            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8),  # 1-22, X=23, Y=24, MT=25
-            tiledb.Dim(name="pos", domain=(1, 300_000_000), tile=100_000, dtype=np.uint32),
-            tiledb.Dim(name="allele_idx", domain=(0, 1000), tile=10, dtype=np.uint16)  # Support up to 1000 alt alleles per position
+            tiledb.Dim(name="chrom", domain=(1, 25), tile=1, dtype=np.int8, filters=CODE_FILTERS),  # 1-22, X=23, Y=24, MT=25
+            tiledb.Dim(name="pos", domain=(1, 300_000_000), tile=100_000, dtype=np.uint32, filters=POSITION_FILTERS),
+            tiledb.Dim(name="allele_idx", domain=(0, 1000), tile=10, dtype=np.uint16, filters=CODE_FILTERS)  # Support up to 1000 alt alleles per position
         ]
         
         # Attributes: population frequency data
         attrs = [
-            tiledb.Attr(name="ref", dtype='U300'),  # Reference allele (increased for large indels)
-            tiledb.Attr(name="alt", dtype='U300'),  # Alternate allele (increased for large indels)
-            tiledb.Attr(name="af_global", dtype=np.float32),
-            tiledb.Attr(name="af_afr", dtype=np.float32),     # African/African American
-            tiledb.Attr(name="af_amr", dtype=np.float32),     # Latino/Admixed American
-            tiledb.Attr(name="af_asj", dtype=np.float32),     # Ashkenazi Jewish
-            tiledb.Attr(name="af_eas", dtype=np.float32),     # East Asian
-            tiledb.Attr(name="af_fin", dtype=np.float32),     # Finnish
-            tiledb.Attr(name="af_nfe", dtype=np.float32),     # Non-Finnish European
-            tiledb.Attr(name="af_oth", dtype=np.float32),     # Other
-            tiledb.Attr(name="ac_global", dtype=np.uint32),   # Allele count
-            tiledb.Attr(name="an_global", dtype=np.uint32),   # Allele number
-            tiledb.Attr(name="nhomalt_global", dtype=np.uint32),  # Homozygous alternate count
-            tiledb.Attr(name="faf95_global", dtype=np.float32),   # Filtering allele frequency 95%
-            tiledb.Attr(name="is_common", dtype=bool),        # True if AF > 1%
+            tiledb.Attr(name="ref", dtype=str, filters=STRING_FILTERS),  # Reference allele (variable length, any indel size)
+            tiledb.Attr(name="alt", dtype=str, filters=STRING_FILTERS),  # Alternate allele (variable length, any indel size)
+            tiledb.Attr(name="af_global", dtype=np.uint16, filters=NUMERIC_FILTERS),
+            tiledb.Attr(name="af_afr", dtype=np.uint16, filters=NUMERIC_FILTERS),     # African/African American
+            tiledb.Attr(name="af_amr", dtype=np.uint16, filters=NUMERIC_FILTERS),     # Latino/Admixed American
+            tiledb.Attr(name="af_asj", dtype=np.uint16, filters=NUMERIC_FILTERS),     # Ashkenazi Jewish
+            tiledb.Attr(name="af_eas", dtype=np.uint16, filters=NUMERIC_FILTERS),     # East Asian
+            tiledb.Attr(name="af_fin", dtype=np.uint16, filters=NUMERIC_FILTERS),     # Finnish
+            tiledb.Attr(name="af_nfe", dtype=np.uint16, filters=NUMERIC_FILTERS),     # Non-Finnish European
+            tiledb.Attr(name="af_oth", dtype=np.uint16, filters=NUMERIC_FILTERS),     # Other
+            tiledb.Attr(name="ac_global", dtype=np.uint32, filters=NUMERIC_FILTERS),   # Allele count
+            tiledb.Attr(name="an_global", dtype=np.uint32, filters=NUMERIC_FILTERS),   # Allele number
+            tiledb.Attr(name="nhomalt_global", dtype=np.uint32, filters=NUMERIC_FILTERS),  # Homozygous alternate count
+            tiledb.Attr(name="faf95_global", dtype=np.uint16, filters=NUMERIC_FILTERS),   # Filtering allele frequency 95%
+            tiledb.Attr(name="is_common", dtype=bool, filters=CODE_FILTERS),        # True if AF > 1%
         ]
         
         # Create sparse array schema (most genomic positions don't have variants)
         domain = tiledb.Domain(*dims)
-        schema = tiledb.ArraySchema(domain=domain, sparse=True, attrs=attrs)
+        schema = tiledb.ArraySchema(
+            domain=domain,
+            sparse=True,
+            attrs=attrs,
+            capacity=POP_FREQ_CAPACITY,
+            cell_order='row-major',
+            tile_order='row-major',
+            offsets_filters=OFFSETS_FILTERS
+        )
         
         return schema
     
     def chromosome_to_int(self, chrom: str) -> int:
         """Convert chromosome string to integer for TileDB storage"""
-        chrom = chrom.replace('chr', '')
-        if chrom == 'X':
-            return 23
-        elif chrom == 'Y':
-            return 24
-        elif chrom == 'MT' or chrom == 'M':
-            return 25
-        else:
-            return int(chrom)
+        try:
+            return CHROM_MAP[chrom]
+        except KeyError:
+            raise ValueError(f"Unsupported chromosome: {chrom}") from None
     
-    def parse_vcf_line(self, line: str) -> Optional[List[PopulationFrequency]]:
-        """Parse a gnomAD VCF line and extract population frequency data
-        
-        Returns a list of PopulationFrequency objects (one per alt allele)
-        """
+    def _parse_vcf_record(self, line: str, columns: Dict[str, list]) -> int:
+        """Parse a gnomAD VCF line, appending one row per observed alt allele to the column lists"""
         if line.startswith('#'):
-            return None
+            return 0
             
-        fields = line.strip().split('\t')
+        # Only the first 8 columns are read; INFO may keep the line terminator, which extract_info_fields drops
+        fields = line.split('\t', 8)
         if len(fields) < 8:
-            return None
+            return 0
         
         chrom = fields[0]
         pos = int(fields[1])
@@ -127,80 +305,176 @@ class GnomadProcessor:
         alts = fields[4].split(',')  # Handle multi-allelic sites
         info = fields[7]
         
-        # Parse INFO field for population frequencies
-        info_dict = {}
-        for item in info.split(';'):
-            if '=' in item:
-                key, value = item.split('=', 1)
-                info_dict[key] = value
-        
-        variants = []
+        # Parse INFO field for population frequencies, scanning for the fields that are read
+        info_dict = extract_info_fields(info)
         
         # For multi-allelic sites, frequencies are comma-separated
-        # Parse arrays of values for each alt allele
-        def parse_array_field(field_name, parse_func=float, default=0.0):
-            value = info_dict.get(field_name, str(default))
-            if ',' in value:
-                return [parse_func(v) for v in value.split(',')]
-            else:
-                return [parse_func(value)] * len(alts)
+        num_alts = len(alts)
+        info_get = info_dict.get
+        allele_values = None
+        
+        # Biallelic records (nearly all of gnomAD) convert each value directly; anything that does
+        # not convert (e.g. a comma-separated value) goes through the per-allele parsing below
+        if num_alts == 1:
+            try:
+                allele_values = (
+                    [float(info_get('AF_joint', 0.0))],
+                    [float(info_get('AF_joint_afr', 0.0))],
+                    [float(info_get('AF_joint_amr', 0.0))],
+                    [float(info_get('AF_joint_asj', 0.0))],
+                    [float(info_get('AF_joint_eas', 0.0))],
+                    [float(info_get('AF_joint_fin', 0.0))],
+                    [float(info_get('AF_joint_nfe', 0.0))],
+                    [float(info_get('AF_joint_oth', 0.0))],
+                    [int(info_get('AC_joint', 0))],
+                    [int(info_get('nhomalt_joint', 0))],
+                    [float(info_get('faf95_joint', 0.0))],
+                )
+            except ValueError:
+                allele_values = None
         
         try:
-            # Extract gnomAD v4.1 population frequencies (arrays for multi-allelic)
-            af_globals = parse_array_field('AF_joint', float, 0.0)
-            af_afrs = parse_array_field('AF_joint_afr', float, 0.0)
-            af_amrs = parse_array_field('AF_joint_amr', float, 0.0)
-            af_asjs = parse_array_field('AF_joint_asj', float, 0.0)
-            af_eass = parse_array_field('AF_joint_eas', float, 0.0)
-            af_fins = parse_array_field('AF_joint_fin', float, 0.0)
-            af_nfes = parse_array_field('AF_joint_nfe', float, 0.0)
-            af_oths = parse_array_field('AF_joint_oth', float, 0.0)
-            
-            # Allele counts and numbers (arrays for multi-allelic)
-            ac_globals = parse_array_field('AC_joint', int, 0)
-            an_global = int(info_dict.get('AN_joint', 0))  # AN is shared across all alts
-            nhomalt_globals = parse_array_field('nhomalt_joint', int, 0)
-            
-            # Filtering allele frequency at 95% confidence
-            faf95_globals = parse_array_field('faf95_joint', float, 0.0)
-            
-            # Create a PopulationFrequency object for each alt allele
-            for i, alt in enumerate(alts):
-                # Skip if allele frequency is 0 (not observed)
-                if af_globals[i] == 0.0:
-                    continue
-                    
-                # Determine if variant is common (>1% global frequency)
-                is_common = af_globals[i] > 0.01
-                
-                variants.append(PopulationFrequency(
-                    chrom=chrom,
-                    pos=pos,
-                    ref=ref,
-                    alt=alt,
-                    af_global=af_globals[i],
-                    af_afr=af_afrs[i] if i < len(af_afrs) else 0.0,
-                    af_amr=af_amrs[i] if i < len(af_amrs) else 0.0,
-                    af_asj=af_asjs[i] if i < len(af_asjs) else 0.0,
-                    af_eas=af_eass[i] if i < len(af_eass) else 0.0,
-                    af_fin=af_fins[i] if i < len(af_fins) else 0.0,
-                    af_nfe=af_nfes[i] if i < len(af_nfes) else 0.0,
-                    af_oth=af_oths[i] if i < len(af_oths) else 0.0,
-                    ac_global=ac_globals[i] if i < len(ac_globals) else 0,
-                    an_global=an_global,
-                    nhomalt_global=nhomalt_globals[i] if i < len(nhomalt_globals) else 0,
-                    faf95_global=faf95_globals[i] if i < len(faf95_globals) else af_globals[i],
-                    is_common=is_common
-                ))
+            if allele_values is None:
+                # Extract gnomAD v4.1 population frequencies (arrays for multi-allelic)
+                allele_values = (
+                    parse_allele_values(info_get('AF_joint'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_afr'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_amr'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_asj'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_eas'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_fin'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_nfe'), num_alts, float, 0.0),
+                    parse_allele_values(info_get('AF_joint_oth'), num_alts, float, 0.0),
+                    # Allele counts (arrays for multi-allelic)
+                    parse_allele_values(info_get('AC_joint'), num_alts, int, 0),
+                    parse_allele_values(info_get('nhomalt_joint'), num_alts, int, 0),
+                    # Filtering allele frequency at 95% confidence
+                    parse_allele_values(info_get('faf95_joint'), num_alts, float, 0.0),
+                )
+            (af_globals, af_afrs, af_amrs, af_asjs, af_eass, af_fins, af_nfes, af_oths,
+             ac_globals, nhomalt_globals, faf95_globals) = allele_values
+            an_global = int(info_get('AN_joint', 0))  # AN is shared across all alts
             
-            return variants if variants else None
+            # Every alt needs a global AF; checked up front so a bad line adds no rows at all
+            if len(af_globals) < num_alts:
+                raise IndexError(f"{len(af_globals)} AF_joint values for {num_alts} alt alleles")
             
         except (ValueError, KeyError, IndexError) as e:
             print(f"Warning: Could not parse variant at {chrom}:{pos} - {e}")
+            return 0
+        
+        # Append a row for each observed alt allele
+        num_rows = 0
+        for i, alt in enumerate(alts):
+            # Skip if allele frequency is 0 (not observed)
+            if af_globals[i] == 0.0:
+                continue
+            
+            columns['chrom'].append(chrom)
+            columns['pos'].append(pos)
+            columns['ref'].append(ref)
+            columns['alt'].append(alt)
+            columns['af_global'].append(af_globals[i])
+            columns['af_afr'].append(af_afrs[i] if i < len(af_afrs) else 0.0)
+            columns['af_amr'].append(af_amrs[i] if i < len(af_amrs) else 0.0)
+            columns['af_asj'].append(af_asjs[i] if i < len(af_asjs) else 0.0)
+            columns['af_eas'].append(af_eass[i] if i < len(af_eass) else 0.0)
+            columns['af_fin'].append(af_fins[i] if i < len(af_fins) else 0.0)
+            columns['af_nfe'].append(af_nfes[i] if i < len(af_nfes) else 0.0)
+            columns['af_oth'].append(af_oths[i] if i < len(af_oths) else 0.0)
+            columns['ac_global'].append(ac_globals[i] if i < len(ac_globals) else 0)
+            columns['an_global'].append(an_global)
+            columns['nhomalt_global'].append(nhomalt_globals[i] if i < len(nhomalt_globals) else 0)
+            columns['faf95_global'].append(faf95_globals[i] if i < len(faf95_globals) else af_globals[i])
+            num_rows += 1
+        
+        return num_rows
+    
+    def parse_vcf_line(self, line: str) -> Optional[List[PopulationFrequency]]:
+        """Parse a gnomAD VCF line and extract population frequency data
+        
+        Returns a list of PopulationFrequency objects (one per alt allele)
+        """
+        columns = {field: [] for field in VARIANT_FIELDS}
+        if not self._parse_vcf_record(line, columns):
             return None
+        
+        columns['is_common'] = [af > COMMON_AF_THRESHOLD for af in columns['af_global']]
+        return [PopulationFrequency(*row) for row in zip(*columns.values())]
+    
+    def parse_vcf_lines(self, lines: List[str]) -> Dict[str, np.ndarray]:
+        """Parse a chunk of gnomAD VCF lines into typed column arrays, one row per alt allele in file order"""
+        columns = {field: [] for field in VARIANT_FIELDS}
+        parse_record = self._parse_vcf_record
+        for line in lines:
+            parse_record(line, columns)
+        
+        # Convert chromosomes to integers, once per distinct name (a gnomAD file holds a single chromosome)
+        chrom_codes = {chrom: self.chromosome_to_int(chrom) for chrom in set(columns['chrom'])}
+        columns['chrom'] = [chrom_codes[chrom] for chrom in columns['chrom']]
+        
+        # Common variants (>1% global frequency), thresholded on the parsed (double) frequencies
+        columns['is_common'] = np.asarray(columns['af_global'], dtype=np.float64) > COMMON_AF_THRESHOLD
+        for name in AF_FIELDS:
+            columns[name] = encode_allele_frequencies(columns[name])
+        
+        # Columns leave the worker in their TileDB dtypes: numeric arrays cross the process
+        # boundary as raw bytes instead of one pickled Python object per value
+        return {name: np.asarray(values, dtype=BATCH_DTYPES[name]) for name, values in columns.items()}
     
-    def process_chromosome(self, chromosome: str, batch_size: int = 10000) -> int:
+    def parse_vcf_chunk(self, chunk: bytes) -> Tuple[int, Dict[str, np.ndarray]]:
+        """Decode and parse a raw block of whole VCF lines, returning (line count, columns)"""
+        lines = chunk.decode('utf-8').split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return len(lines), self.parse_vcf_lines(lines)
+    
+    def _iter_vcf_chunks(self, f: BinaryIO) -> Iterator[bytes]:
+        """Read the decompressed VCF as raw blocks that end on a line boundary"""
+        while True:
+            block = f.read(VCF_CHUNK_SIZE)
+            if not block:
+                break
+            
+            # Finish the block's last line with readline rather than carrying a partial line over
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            yield block
+    
+    def _iter_parsed_chunks(self, f: BinaryIO, workers: int = 1) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """Parse the VCF stream in line-aligned chunks on a process pool, yielding (line count, columns) in file order"""
+        # Results must stay in file order: allele indices depend on the order variants arrive in.
+        # The main process only moves raw bytes; decoding and line splitting happen in the workers
+        chunks = self._iter_vcf_chunks(f)
+        
+        if workers <= 1:
+            for chunk in chunks:
+                yield self.parse_vcf_chunk(chunk)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=PROCESS_CONTEXT) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(self.parse_vcf_chunk, chunk))
+                
+                # Keep every worker busy without reading the whole file ahead
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+    
+    def _open_vcf(self, vcf_file: str, decompress_threads: Optional[int] = None) -> BinaryIO:
+        """Open a bgzipped gnomAD VCF as a decompressed binary stream"""
+        if rapidgzip is not None:
+            return rapidgzip.open(vcf_file, parallelization=decompress_threads or os.cpu_count() or 1)
+        return gzip.open(vcf_file, 'rb')
+    
+    def process_chromosome(self, chromosome: str, batch_size: int = 10000, parse_workers: Optional[int] = None,
+                           decompress_threads: Optional[int] = None) -> int:
         """Process a single chromosome's gnomAD VCF file"""
+        if parse_workers is None:
+            parse_workers = VCF_PARSE_WORKERS
         
         vcf_file = os.path.join(self.gnomad_dir, f'gnomad.joint.v4.1.sites.chr{chromosome}.vcf.bgz')
         
@@ -216,60 +490,64 @@ class GnomadProcessor:
         common_count = 0
         lines_processed = 0
         
-        # Track allele indices per position to avoid duplicates
-        position_allele_map = {}
-        
-        # Prepare batch data for TileDB insertion
-        batch_data = []
+        # Allele indices of the current position; the VCF is position-sorted, so reset on every new position
+        last_pos_key = None
+        position_alleles = {}
         
         try:
-            with gzip.open(vcf_file, 'rt') as f:
-                for line_num, line in enumerate(f):
-                    lines_processed += 1
-                    if line_num % 100000 == 0 and line_num > 0:
-                        print(f"  Processed {line_num:,} lines, {variants_processed:,} variants...")
-                    
-                    variants = self.parse_vcf_line(line)
-                    if variants is None:
-                        continue
+            # One writer per chromosome instead of opening the array for every batch
+            write_ctx = tiledb.Ctx(tiledb.Config(WRITE_CONFIG))
+            with self._open_vcf(vcf_file, decompress_threads) as f, tiledb.open(self.pop_freq_array, 'w', ctx=write_ctx) as pop_freq_array, \
+                    BatchWriter(lambda batch: self._write_batch_to_tiledb(pop_freq_array, batch), batch_size) as writer:
+                # Preallocated batch columns for TileDB insertion; full batches are written in the background
+                buffers = writer.buffers
+                
+                # Lines are parsed in worker processes; allele indices are assigned here, in file order
+                for num_lines, columns in self._iter_parsed_chunks(f, parse_workers):
+                    lines_processed += num_lines
+                    if lines_processed // 100000 > (lines_processed - num_lines) // 100000:
+                        print(f"  Processed {lines_processed:,} lines, {variants_processed:,} variants...")
                     
-                    # Process each variant (handles multi-allelic sites)
-                    for variant in variants:
-                        # Convert chromosome to integer
-                        chrom_int = self.chromosome_to_int(variant.chrom)
-                        
-                        # Create unique allele index for this position
-                        pos_key = (chrom_int, variant.pos)
-                        if pos_key not in position_allele_map:
-                            position_allele_map[pos_key] = {}
-                        
-                        allele_key = f"{variant.ref}>{variant.alt}"
-                        if allele_key not in position_allele_map[pos_key]:
-                            # Assign next available index for this position
-                            position_allele_map[pos_key][allele_key] = len(position_allele_map[pos_key])
-                        
-                        allele_idx = position_allele_map[pos_key][allele_key]
-                        
+                    # Create unique allele index for each variant's position (handles multi-allelic sites)
+                    allele_idx = []
+                    repeated = []
+                    for row, (chrom_int, pos, ref, alt) in enumerate(zip(columns['chrom'].tolist(), columns['pos'].tolist(), columns['ref'], columns['alt'])):
+                        pos_key = (chrom_int, pos)
+                        if pos_key != last_pos_key:
+                            last_pos_key = pos_key
+                            position_alleles = {}
                         
-                        # Add to batch with 3D coordinates
-                        batch_data.append({
-                            'coords': (chrom_int, variant.pos, allele_idx),
-                            'data': variant
-                        })
-                        
-                        variants_processed += 1
-                        if variant.is_common:
-                            common_count += 1
+                        # Assign next available index for this position; a repeated ref>alt keeps its
+                        # first row only, since a second cell would duplicate its coordinates
+                        allele_key = f"{ref}>{alt}"
+                        if allele_key in position_alleles:
+                            repeated.append(row)
+                            continue
+                        position_alleles[allele_key] = len(position_alleles)
+                        allele_idx.append(position_alleles[allele_key])
+                    
+                    if repeated:
+                        print(f"Warning: Dropped {len(repeated):,} repeated alleles (first at {chromosome}:{columns['pos'][repeated[0]]})")
+                        keep = np.ones(len(columns['pos']), dtype=bool)
+                        keep[repeated] = False
+                        columns = {name: values[keep] for name, values in columns.items()}
+                    columns['allele_idx'] = np.array(allele_idx, dtype=BATCH_DTYPES['allele_idx'])
+                    
+                    num_variants = len(allele_idx)
+                    variants_processed += num_variants
+                    common_count += int(np.count_nonzero(columns['is_common']))
                     
-                    # Write batch when it reaches batch_size
-                    if len(batch_data) >= batch_size:
-                        self._write_batch_to_tiledb(batch_data)
-                        batch_data = []
+                    # Copy the chunk into the batch, writing each batch as it fills
+                    start = 0
+                    while start < num_variants:
+                        start += buffers.fill(columns, start)
+                        if buffers.is_full():
+                            buffers = writer.submit()
                 
                 # Write remaining batch
-                if batch_data:
-                    self._write_batch_to_tiledb(batch_data)
+                writer.submit()
             
+            self.stats['common_variants'] += common_count
             print(f"✅ Chromosome {chromosome}: {variants_processed:,} variants ({common_count:,} common)")
             print(f"  Total lines processed: {lines_processed:,}")
             
@@ -280,69 +558,28 @@ class GnomadProcessor:
         
         return variants_processed
     
-    def _write_batch_to_tiledb(self, batch_data: List[Dict]) -> None:
-        """Write a batch of variants to TileDB array"""
-        if not batch_data:
+    def _write_batch_to_tiledb(self, A: tiledb.Array, buffers: BatchBuffers) -> None:
+        """Write the filled rows of the batch buffers to TileDB array, then empty the buffers"""
+        if buffers.cursor == 0:
             return
         
-        # Prepare coordinate and attribute arrays
-        coords = [item['coords'] for item in batch_data]
-        
-        # Separate coordinates into dimensions (now 3D) with explicit numpy types
-        chrom_coords = np.array([int(c[0]) for c in coords], dtype=np.int8)
-        pos_coords = np.array([int(c[1]) for c in coords], dtype=np.uint32)
-        allele_idx_coords = np.array([int(c[2]) for c in coords], dtype=np.uint16)
-        
-        # Prepare attribute data with explicit numpy conversion
-        ref_data = np.array([item['data'].ref for item in batch_data], dtype='U300')
-        alt_data = np.array([item['data'].alt for item in batch_data], dtype='U300')
-        af_global_data = np.array([item['data'].af_global for item in batch_data], dtype=np.float32)
-        af_afr_data = np.array([item['data'].af_afr for item in batch_data], dtype=np.float32)
-        af_amr_data = np.array([item['data'].af_amr for item in batch_data], dtype=np.float32)
-        af_asj_data = np.array([item['data'].af_asj for item in batch_data], dtype=np.float32)
-        af_eas_data = np.array([item['data'].af_eas for item in batch_data], dtype=np.float32)
-        af_fin_data = np.array([item['data'].af_fin for item in batch_data], dtype=np.float32)
-        af_nfe_data = np.array([item['data'].af_nfe for item in batch_data], dtype=np.float32)
-        af_oth_data = np.array([item['data'].af_oth for item in batch_data], dtype=np.float32)
-        ac_global_data = np.array([item['data'].ac_global for item in batch_data], dtype=np.uint32)
-        an_global_data = np.array([item['data'].an_global for item in batch_data], dtype=np.uint32)
-        nhomalt_global_data = np.array([item['data'].nhomalt_global for item in batch_data], dtype=np.uint32)
-        faf95_global_data = np.array([item['data'].faf95_global for item in batch_data], dtype=np.float32)
-        is_common_data = np.array([item['data'].is_common for item in batch_data], dtype=bool)
+        # Column views of the batch: the three coordinates, the rest are attributes
+        data = buffers.view()
+        buffers.cursor = 0
+        chrom_coords = data.pop('chrom')
+        pos_coords = data.pop('pos')
+        allele_idx_coords = data.pop('allele_idx')
         
         # Write to TileDB with 3D coordinates
+        # Coordinates are typed by the batch buffers (BATCH_DTYPES), so they go straight to TileDB
         try:
-            # Validate coordinates before writing
-            for i, (c, p, a) in enumerate(zip(chrom_coords[:3], pos_coords[:3], allele_idx_coords[:3])):
-                if not isinstance(c, (int, np.integer)) or not isinstance(p, (int, np.integer)) or not isinstance(a, (int, np.integer)):
-                    print(f"  Invalid coordinate types at index {i}: c={type(c)}, p={type(p)}, a={type(a)}")
-                    print(f"  Values: c={c}, p={p}, a={a}")
-                    
-            with tiledb.open(self.pop_freq_array, 'w') as A:
-                
-                A[chrom_coords, pos_coords, allele_idx_coords] = {
-                    'ref': ref_data,
-                    'alt': alt_data,
-                    'af_global': af_global_data,
-                    'af_afr': af_afr_data,
-                    'af_amr': af_amr_data,
-                    'af_asj': af_asj_data,
-                    'af_eas': af_eas_data,
-                    'af_fin': af_fin_data,
-                    'af_nfe': af_nfe_data,
-                    'af_oth': af_oth_data,
-                    'ac_global': ac_global_data,
-                    'an_global': an_global_data,
-                    'nhomalt_global': nhomalt_global_data,
-                    'faf95_global': faf95_global_data,
-                    'is_common': is_common_data
-                }
+            A[chrom_coords, pos_coords, allele_idx_coords] = data
         except Exception as e:
             print(f"  TileDB write error: {e}")
             print(f"  Batch size: {len(chrom_coords)}")
             if len(chrom_coords) > 0:
                 print(f"  Sample coords: {list(zip(chrom_coords[:3], pos_coords[:3], allele_idx_coords[:3]))}")
-                print(f"  Sample ref/alt: {list(zip(ref_data[:3], alt_data[:3]))}")
+                print(f"  Sample ref/alt: {list(zip(data['ref'][:3], data['alt'][:3]))}")
             print(f"  Skipping this batch and continuing...")
             return  # Skip this batch and continue processing
     
@@ -373,15 +610,40 @@ class GnomadProcessor:
         
         start_time = time.time()
         
-        for chrom in chromosomes:
-            variants_count = self.process_chromosome(chrom)
-            self.stats['total_variants'] += variants_count
-            self.stats['chromosomes_processed'].append(chrom)
+        # Per-chromosome (variant, common variant) counts, recorded in the array metadata afterwards
+        chromosome_counts = {}
+        
+        chromosome_workers = min(CHROMOSOME_WORKERS, len(chromosomes))
+        if chromosome_workers <= 1:
+            for chrom in chromosomes:
+                common_before = self.stats['common_variants']
+                variants_count = self.process_chromosome(chrom)
+                self.stats['total_variants'] += variants_count
+                self.stats['chromosomes_processed'].append(chrom)
+                chromosome_counts[chrom] = (variants_count, self.stats['common_variants'] - common_before)
+        else:
+            # Each chromosome is written by its own process as separate fragments of the shared array;
+            # its share of the cores is split between decompression and parsing
+            cores_per_chromosome = max(1, (os.cpu_count() or 1) // chromosome_workers)
+            parse_workers = max(1, cores_per_chromosome - 1)
+            print(f"  Processing {chromosome_workers} chromosomes at a time")
+            with ProcessPoolExecutor(max_workers=chromosome_workers, mp_context=PROCESS_CONTEXT) as executor:
+                futures = [
+                    executor.submit(_process_chromosome_worker, self.workspace_path, chrom, parse_workers, cores_per_chromosome)
+                    for chrom in chromosomes
+                ]
+                for chrom, future in zip(chromosomes, futures):
+                    variants_count, common_count = future.result()
+                    self.stats['total_variants'] += variants_count
+                    self.stats['common_variants'] += common_count
+                    self.stats['chromosomes_processed'].append(chrom)
+                    chromosome_counts[chrom] = (variants_count, common_count)
         
         self.stats['processing_time'] = time.time() - start_time
         
         # Update common/rare variant counts
         self._calculate_final_stats()
+        self._update_summary_metadata(chromosome_counts)
         
         print(f"\n✅ gnomAD processing completed in {self.stats['processing_time']:.1f} seconds")
         print(f"📊 Total variants: {self.stats['total_variants']:,}")
@@ -389,15 +651,30 @@ class GnomadProcessor:
         print(f"📊 Rare variants (<1%): {self.stats['rare_variants']:,}")
     
     def _calculate_final_stats(self) -> None:
-        """Calculate final statistics by querying the TileDB array"""
-        try:
-            with tiledb.open(self.pop_freq_array, 'r') as A:
-                # Query for common variants
-                common_query = A.query(attrs=['is_common']).df[:]
-                self.stats['common_variants'] = common_query['is_common'].sum()
-                self.stats['rare_variants'] = self.stats['total_variants'] - self.stats['common_variants']
-        except Exception as e:
-            print(f"Warning: Could not calculate final stats: {e}")
+        """Calculate final statistics from the counts kept while processing (no re-read of the array)"""
+        self.stats['rare_variants'] = self.stats['total_variants'] - self.stats['common_variants']
+    
+    def _update_summary_metadata(self, chromosome_counts: Dict[str, Tuple[int, int]]) -> None:
+        """Record per-chromosome and whole-array variant counts in the array metadata"""
+        with tiledb.open(self.pop_freq_array, 'r') as A:
+            meta = dict(A.meta.items())
+        
+        # Chromosomes without a VCF file (0 variants) keep the counts of any earlier run
+        for chrom, (variants_count, common_count) in chromosome_counts.items():
+            if variants_count > 0:
+                meta[f'variants_chr{chrom}'] = variants_count
+                meta[f'common_variants_chr{chrom}'] = common_count
+        
+        # Totals cover every chromosome ingested so far, not only this run's
+        total_variants = sum(v for k, v in meta.items() if k.startswith('variants_chr'))
+        common_variants = sum(v for k, v in meta.items() if k.startswith('common_variants_chr'))
+        meta['total_variants'] = total_variants
+        meta['common_variants'] = common_variants
+        meta['common_ratio'] = common_variants / total_variants if total_variants else 0.0
+        
+        with tiledb.open(self.pop_freq_array, 'w') as A:
+            for key, value in meta.items():
+                A.meta[key] = value
     
     def optimize_arrays(self) -> None:
         """Optimize TileDB arrays by consolidating fragments"""
@@ -433,6 +710,14 @@ class GnomadProcessor:
         
         return info
 
+def _process_chromosome_worker(workspace_path: str, chromosome: str, parse_workers: int,
+                               decompress_threads: int) -> Tuple[int, int]:
+    """Process one chromosome in a worker process, returning its (variant, common variant) counts"""
+    processor = GnomadProcessor(workspace_path)
+    variants_count = processor.process_chromosome(chromosome, parse_workers=parse_workers,
+                                                  decompress_threads=decompress_threads)
+    return variants_count, processor.stats['common_variants']
+
 def main():
     parser = argparse.ArgumentParser(description='Process gnomAD VCF files for population frequency analysis')
     parser.add_argument('workspace_path', help='Path to TileDB workspace directory')
@@ -103,14 +103,9 @@ export class PopulationFrequencyService {
    * Get population frequency context for variant interpretation
    */
   async getPopulationContext(variants: Array<{chrom: string, pos: number, ref: string, alt: string}>): Promise<Array<PopulationLookupResult>> {
-    const results = [];
-    
-    for (const variant of variants) {
-      const result = await this.lookupVariantFrequency(variant.chrom, variant.pos, variant.ref, variant.alt);
-      results.push(result);
-    }
-    
-    return results;
+    // Issued together so the daemon client sends them as batch lookups
+    return Promise.all(variants.map(variant =>
+      this.lookupVariantFrequency(variant.chrom, variant.pos, variant.ref, variant.alt)));
   }
 
   /**
@@ -122,9 +117,10 @@ export class PopulationFrequencyService {
   ): Promise<Array<{variant: any, populationData: PopulationLookupResult, passesFilter: boolean}>> {
     
     const results = [];
+    const lookups = await this.getPopulationContext(variants);
     
-    for (const variant of variants) {
-      const populationData = await this.lookupVariantFrequency(variant.chrom, variant.pos, variant.ref, variant.alt);
+    for (const [i, variant] of variants.entries()) {
+      const populationData = lookups[i];
       
       let passesFilter = true;
       
@@ -79,8 +79,11 @@ def create_variants_array(array_path):
         tiledb.Attr(name="alt", dtype="U500", nullable=False),  # Comma-separated alts
         tiledb.Attr(name="qual", dtype=np.float32, nullable=True),
         tiledb.Attr(name="filter", dtype="U100", nullable=True),
-        tiledb.Attr(name="info", dtype="U2000", nullable=True),  # JSON string
-        tiledb.Attr(name="samples", dtype="U5000", nullable=True),  # JSON string
+        tiledb.Attr(name="info", dtype="U2000", nullable=True),  # JSON string (af/dp below are the typed copies)
+        tiledb.Attr(name="samples", dtype="U5000", nullable=True),  # JSON string (gt below is the typed copy)
+        tiledb.Attr(name="af", dtype=np.float32, nullable=True),  # INFO AF (first value), NaN if absent
+        tiledb.Attr(name="dp", dtype=np.int32, nullable=True),  # INFO DP, -1 if absent
+        tiledb.Attr(name="gt", dtype=np.int8, var=True, nullable=True),  # GT allele indices, 2 per sample in header order, -1 if missing
     ]
     
     # Create schema
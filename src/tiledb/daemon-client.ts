@@ -35,12 +35,37 @@ export interface PopulationFrequencyResult {
     }>;
 }
 
+export interface GeneAtPosition {
+    gene_name: string;
+    gene_id: string;
+    chrom: string;
+    start: number;
+    end: number;
+    gene_type?: string;
+    strand?: '+' | '-';
+    transcript_count?: number;
+    clinical_significance?: string | null;
+}
+
+export interface PopulationVariant {
+    chrom: string;
+    pos: number;
+    ref: string;
+    alt: string;
+}
+
 export class TileDBDaemonClient {
     private socketPath: string;
     private daemonProcess: ChildProcess | null = null;
     private pythonEnv: string;
     private workspace: string;
     private isStarting: boolean = false;
+    // Persistent daemon connections waiting for the next request
+    private idleSockets: Array<{ socket: net.Socket; release: () => void }> = [];
+    private static readonly MAX_IDLE_SOCKETS = 2;
+    // Population lookups made in the same tick, sent to the daemon together as batch requests
+    private pendingLookups: Array<{ variant: PopulationVariant; resolve: (result: PopulationFrequencyResult) => void }> = [];
+    private static readonly MAX_LOOKUP_BATCH = 1000;
 
     constructor() {
         this.workspace = config.tiledb.workspace;
@@ -125,33 +150,109 @@ export class TileDBDaemonClient {
     }
 
     private async sendRequest(request: any): Promise<any> {
+        const idle = this.idleSockets.pop();
+        if (idle) {
+            idle.release();
+            try {
+                return await this.exchange(idle.socket, request);
+            } catch (error) {
+                // The daemon may have closed the idle connection; retry once on a fresh one
+            }
+        }
+
+        return this.exchange(await this.connect(), request);
+    }
+
+    private connect(): Promise<net.Socket> {
         return new Promise((resolve, reject) => {
-            const client = net.createConnection(this.socketPath);
-            
-            client.on('connect', () => {
-                client.write(JSON.stringify(request));
+            const socket = net.createConnection(this.socketPath);
+            socket.once('error', reject);
+            socket.once('connect', () => {
+                socket.off('error', reject);
+                resolve(socket);
             });
+        });
+    }
 
-            client.on('data', (data) => {
+    private exchange(socket: net.Socket, request: any): Promise<any> {
+        return new Promise((resolve, reject) => {
+            // Responses may arrive in several chunks; parse once the whole frame is buffered
+            const chunks: Buffer[] = [];
+            let received = 0;
+            let expected = -1;
+
+            const detach = () => {
+                socket.off('data', onData);
+                socket.off('error', onFailure);
+                socket.off('close', onClose);
+                socket.off('timeout', onTimeout);
+                socket.setTimeout(0);
+            };
+            const fail = (error: Error) => {
+                detach();
+                socket.destroy();
+                reject(error);
+            };
+            const onFailure = (error: Error) => fail(error);
+            const onClose = () => fail(new Error('Connection closed before the full response was received'));
+            const onTimeout = () => fail(new Error('Request timeout'));
+            const onData = (data: Buffer) => {
+                chunks.push(data);
+                received += data.length;
+                if (expected < 0 && received >= 4) {
+                    expected = 4 + Buffer.concat(chunks).readUInt32LE(0);
+                }
+                if (expected < 0 || received < expected) {
+                    return;
+                }
+
+                detach();
+                const body = Buffer.concat(chunks).subarray(4, expected).toString('utf8');
                 try {
-                    const response = JSON.parse(data.toString());
+                    const response = JSON.parse(body);
+                    this.keepIdle(socket);
                     resolve(response);
                 } catch (error) {
-                    reject(new Error(`Invalid JSON response: ${data.toString()}`));
+                    socket.destroy();
+                    reject(new Error(`Invalid JSON response: ${body}`));
                 }
-                client.end();
-            });
+            };
 
-            client.on('error', (error) => {
-                reject(error);
-            });
+            socket.on('data', onData);
+            socket.on('error', onFailure);
+            socket.on('close', onClose);
+            socket.on('timeout', onTimeout);
+            socket.setTimeout(30000);
+            socket.ref();
+
+            // Messages are framed as a 4-byte little-endian payload length followed by the JSON payload
+            const payload = Buffer.from(JSON.stringify(request), 'utf8');
+            const header = Buffer.alloc(4);
+            header.writeUInt32LE(payload.length, 0);
+            socket.write(Buffer.concat([header, payload]));
+        });
+    }
 
-            client.on('timeout', () => {
-                reject(new Error('Request timeout'));
-            });
+    private keepIdle(socket: net.Socket): void {
+        if (this.idleSockets.length >= TileDBDaemonClient.MAX_IDLE_SOCKETS) {
+            socket.end();
+            return;
+        }
 
-            // Set timeout
-            client.setTimeout(30000);
+        // Idle connections must not keep the process alive, and drop out of the pool when the daemon closes them
+        const onClose = () => {
+            this.idleSockets = this.idleSockets.filter(idle => idle.socket !== socket);
+        };
+        const ignoreError = () => {};
+        socket.once('close', onClose);
+        socket.on('error', ignoreError);
+        socket.unref();
+        this.idleSockets.push({
+            socket,
+            release: () => {
+                socket.off('close', onClose);
+                socket.off('error', ignoreError);
+            }
         });
     }
 
@@ -230,23 +331,66 @@ export class TileDBDaemonClient {
     }
 
     async lookupPopulationFrequency(chrom: string, pos: number, ref: string, alt: string): Promise<PopulationFrequencyResult> {
+        return new Promise(resolve => {
+            this.pendingLookups.push({ variant: { chrom, pos, ref, alt }, resolve });
+            if (this.pendingLookups.length === 1) {
+                setImmediate(() => this.flushLookups());
+            }
+        });
+    }
+
+    private async flushLookups(): Promise<void> {
+        const pending = this.pendingLookups;
+        this.pendingLookups = [];
+
+        for (let start = 0; start < pending.length; start += TileDBDaemonClient.MAX_LOOKUP_BATCH) {
+            const batch = pending.slice(start, start + TileDBDaemonClient.MAX_LOOKUP_BATCH);
+            const results = await this.lookupPopulationFrequencies(batch.map(lookup => lookup.variant));
+            batch.forEach((lookup, i) => lookup.resolve(results[i]));
+        }
+    }
+
+    async lookupPopulationFrequencies(variants: PopulationVariant[]): Promise<PopulationFrequencyResult[]> {
         try {
             await this.ensureDaemonRunning();
             
             const response = await this.sendRequest({
-                operation: 'population_frequency_lookup',
-                params: { chrom, pos, ref, alt }
+                operation: 'population_frequency_lookup_batch',
+                params: { variants }
             });
 
             if (response.error) {
                 console.error(`Population frequency lookup error: ${response.error}`);
-                return { variants: [] };
+                return variants.map(() => ({ variants: [] }));
             }
 
-            return response;
+            // One entry per requested variant, null when it is not in the array
+            return response.variants.map((variant: PopulationFrequencyResult['variants'][number] | null) =>
+                ({ variants: variant ? [variant] : [] }));
         } catch (error) {
-            console.error(`Error looking up population frequency: ${error}`);
-            return { variants: [] };
+            console.error(`Error looking up population frequencies: ${error}`);
+            return variants.map(() => ({ variants: [] }));
+        }
+    }
+
+    async lookupGenesAt(chrom: string, pos: number): Promise<GeneAtPosition[]> {
+        try {
+            await this.ensureDaemonRunning();
+            
+            const response = await this.sendRequest({
+                operation: 'gene_lookup_at',
+                params: { chrom, pos }
+            });
+
+            if (response.error) {
+                console.error(`Gene lookup error: ${response.error}`);
+                return [];
+            }
+
+            return response.genes || [];
+        } catch (error) {
+            console.error(`Error looking up genes at position: ${error}`);
+            return [];
         }
     }
 
@@ -291,6 +435,12 @@ export class TileDBDaemonClient {
     }
 
     async shutdown(): Promise<void> {
+        for (const idle of this.idleSockets) {
+            idle.release();
+            idle.socket.destroy();
+        }
+        this.idleSockets = [];
+
         if (this.daemonProcess) {
             this.daemonProcess.kill('SIGTERM');
             this.daemonProcess = null;
@@ -322,6 +472,8 @@ export class DaemonClient {
                 );
             case 'population_frequency_stats':
                 return await this.client.getPopulationStatistics();
+            case 'genes_at_position':
+                return { genes: await this.client.lookupGenesAt(query.chrom.toString(), query.pos) };
             default:
                 // Fallback to variants query for compatibility
                 const variants = await this.client.queryVariants({
@@ -5,130 +5,353 @@ Consolidates fragments and vacuums arrays for optimal performance
 """
 
 import tiledb
+import argparse
 import os
-import sys
+import stat
+import time
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Consolidation/vacuum settings shared by every array: bigger buffers mean fewer passes over the
+# data, and each step merges between 2 and 32 fragments. A step minimum of 2 lets an explicit
+# consolidate_array merge any array with more than one fragment; optimize_all_arrays skips small
+# arrays with its own MIN_FRAGMENTS check instead
+CONSOLIDATION_CONFIG = {
+    'sm.consolidation.buffer_size': str(256 * 1024 * 1024),
+    'sm.consolidation.mode': 'fragments',
+    'sm.consolidation.step_min_frags': '2',
+    'sm.consolidation.step_max_frags': '32',
+    'sm.vacuum.mode': 'fragments',
+}
+
+# Sparse consolidation splits its output into fragments of at most this many bytes
+SPARSE_MAX_FRAGMENT_SIZE = 2 << 30
+
+# Arrays with fewer fragments than this are left alone by optimize_all_arrays
+MIN_FRAGMENTS = 4
+
+# Array subdirectories whose modification times change whenever the array is written, consolidated or vacuumed;
+# __schema comes first, and a missing one means the path is not an array
+ARRAY_STATE_DIRS = ('__schema', '__fragments', '__commits')
+
+# Size units from largest to smallest, for _fmt_size
+_UNITS = (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1))
+
+def _fmt_size(n: int) -> str:
+    """Human-readable size in the largest unit that n reaches"""
+    for unit, scale in _UNITS:
+        if n >= scale or scale == 1:
+            return f"{n / scale:.1f} {unit}"
+
+def _array_state(array_path: str) -> Tuple:
+    """Modification times of the array's state directories (None for a missing one)"""
+    state = []
+    prefix = array_path + os.sep
+    for name in ARRAY_STATE_DIRS:
+        try:
+            state.append(os.stat(prefix + name).st_mtime_ns)
+        except OSError:
+            state.append(None)
+    return tuple(state)
+
+def _dir_size(path: str) -> Tuple[int, int]:
+    """Total size of the files under path, and how many fragment directories its __fragments holds"""
+    total_size = 0
+    fragment_count = 0
+    
+    # Directories still to scan, with whether they are a __fragments directory
+    stack = [(path, False)]
+    while stack:
+        directory, is_fragments = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # One lstat per entry classifies it and gives its size; symlinks are skipped
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    total_size += st.st_size
+                elif stat.S_ISDIR(st.st_mode):
+                    # Each child directory of __fragments is one fragment
+                    if is_fragments:
+                        fragment_count += 1
+                    stack.append((entry.path, entry.name == '__fragments'))
+    
+    return total_size, fragment_count
+
+def _local_path(uri: str) -> str:
+    """Filesystem path of a file:// URI returned by TileDB"""
+    if uri.startswith('file://'):
+        return uri[len('file://'):]
+    raise ValueError(f"Not a local URI: {uri}")
+
+def _array_size(array_path: str, ctx: Optional[tiledb.Ctx] = None) -> Tuple[int, int]:
+    """Total size on disk and fragment count of an array, using TileDB's fragment list"""
+    try:
+        fragments = tiledb.array_fragments(array_path, ctx=ctx)
+        fragment_paths = [_local_path(uri) for uri in fragments.uri + fragments.to_vacuum]
+    except (tiledb.TileDBError, ValueError):
+        return _dir_size(array_path)
+    
+    # Fragments (including consolidated ones still waiting for vacuum), then everything outside
+    # __fragments: schema, commits and metadata
+    total_size = sum(_dir_size(path)[0] for path in fragment_paths)
+    with os.scandir(array_path) as entries:
+        for entry in entries:
+            if entry.name == '__fragments':
+                continue
+            st = entry.stat(follow_symlinks=False)
+            if stat.S_ISREG(st.st_mode):
+                total_size += st.st_size
+            elif stat.S_ISDIR(st.st_mode):
+                total_size += _dir_size(entry.path)[0]
+    
+    return total_size, len(fragments)
+
 class TileDBMaintenance:
-    def __init__(self, workspace_path: str):
+    def __init__(self, workspace_path: str, parallelism: int = 1, config: Optional[Dict[str, str]] = None,
+                 min_fragments: int = MIN_FRAGMENTS):
         self.workspace_path = workspace_path
         
+        # Array paths are this prefix plus the array name, without an os.path.join per lookup
+        self._workspace_prefix = os.path.join(workspace_path, '')
+        
+        # One TileDB config and context for all consolidations; TILEDB_SM_* environment variables
+        # (e.g. TILEDB_SM_CONSOLIDATION_BUFFER_SIZE) and the config argument override the defaults
+        settings = dict(CONSOLIDATION_CONFIG)
+        for key in settings:
+            env_value = os.environ.get('TILEDB_' + key.replace('.', '_').upper())
+            if env_value:
+                settings[key] = env_value
+        settings.update(config or {})
+        self.config = tiledb.Config(settings)
+        self.ctx = tiledb.Ctx(self.config)
+        
+        # Arrays optimized at once; consolidation buffers are large, so the default stays sequential
+        self.parallelism = max(1, parallelism)
+        
+        # Fragment count an array needs before optimize_all_arrays rewrites it
+        self.min_fragments = min_fragments
+        
+        # get_array_info and _fast_info results by array path, with the array state they were computed for
+        self._info_cache = {}
+        self._fast_info_cache = {}
+        
     def consolidate_array(self, array_name: str) -> bool:
         """Consolidate array fragments for better read performance"""
-        array_path = os.path.join(self.workspace_path, array_name)
+        array_path = self._workspace_prefix + array_name
         
         if not os.path.exists(array_path):
             logger.error(f"Array {array_name} does not exist at {array_path}")
             return False
             
+        self._info_cache.pop(array_path, None)
+        self._fast_info_cache.pop(array_path, None)
+        
         try:
-            logger.info(f"Consolidating fragments for array: {array_name}")
+            start_time = time.time()
+            schema = self._load_schema(array_path)
+            
+            # Sparse arrays merge fragments capped in size; dense arrays also consolidate the surviving fragment
+            # footers, and fragment consolidation already expands to whole space tiles
+            if schema.sparse:
+                modes = ['fragments', 'array_meta']
+                mode_settings = {'fragments': {'sm.consolidation.max_fragment_size': str(SPARSE_MAX_FRAGMENT_SIZE)}}
+                layout = "sparse"
+            else:
+                modes = ['fragments', 'fragment_meta', 'array_meta']
+                mode_settings = {}
+                tile_cells = 1
+                for dim in schema.domain:
+                    tile_cells *= int(dim.tile)
+                layout = f"dense, {tile_cells:,} cells per space tile"
+            plan = ' -> '.join(modes)
+            logger.debug("Consolidation plan for %s (%s): %s, then vacuum", array_name, layout, plan)
             
             # Consolidate fragments
-            tiledb.consolidate(array_path)
-            logger.info(f"Successfully consolidated {array_name}")
+            logger.debug("Consolidating fragments for array: %s", array_name)
+            for mode in modes:
+                config = self._mode_config(mode, mode_settings.get(mode))
+                tiledb.consolidate(array_path, config=config, ctx=self.ctx)
+            logger.debug("Successfully consolidated %s", array_name)
             
-            # Vacuum consolidated fragments
-            logger.info(f"Vacuuming consolidated fragments for: {array_name}")
-            tiledb.vacuum(array_path)
-            logger.info(f"Successfully vacuumed {array_name}")
+            # Vacuum what each consolidation mode left behind
+            logger.debug("Vacuuming consolidated fragments for: %s", array_name)
+            for mode in modes:
+                tiledb.vacuum(array_path, config=self._mode_config(mode), ctx=self.ctx)
+            logger.debug("Successfully vacuumed %s", array_name)
             
+            logger.info("%s: consolidated (%s) and vacuumed in %.1fs", array_name, plan, time.time() - start_time)
             return True
             
         except Exception as e:
             logger.error(f"Error consolidating array {array_name}: {e}")
             return False
     
+    def _load_schema(self, array_path: str) -> tiledb.ArraySchema:
+        """Read just the array schema, without loading fragment metadata"""
+        try:
+            return tiledb.ArraySchema.load(array_path, ctx=self.ctx)
+        except tiledb.TileDBError:
+            # Fall back to opening the array for schemas ArraySchema.load cannot read
+            with tiledb.open(array_path, ctx=self.ctx) as array:
+                return array.schema
+    
+    def _mode_config(self, mode: str, settings: Optional[Dict[str, str]] = None) -> tiledb.Config:
+        """Copy of the shared config with the consolidation and vacuum mode set to mode"""
+        config = tiledb.Config(self.config.dict())
+        config['sm.consolidation.mode'] = mode
+        config['sm.vacuum.mode'] = mode
+        for key, value in (settings or {}).items():
+            config[key] = value
+        return config
+    
     def get_array_info(self, array_name: str) -> dict:
         """Get information about array fragments and size"""
-        array_path = os.path.join(self.workspace_path, array_name)
+        array_path = self._workspace_prefix + array_name
         
-        if not os.path.exists(array_path):
+        # The state stat of __schema doubles as the existence check
+        state = _array_state(array_path)
+        if state[0] is None:
             return {"error": f"Array {array_name} does not exist"}
         
+        # Unchanged arrays reuse the previous result instead of walking the directory again
+        cached = self._info_cache.get(array_path)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        
         try:
             # Get array size on disk
-            total_size = 0
-            fragment_count = 0
+            total_size, fragment_count = _array_size(array_path, self.ctx)
             
-            for root, dirs, files in os.walk(array_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    total_size += os.path.getsize(file_path)
-                    
-                    # Count fragment directories
-                    if '__fragments' in root:
-                        fragment_count += 1
+            # Get array schema info
+            schema = self._load_schema(array_path)
             
-            # Format size
-            if total_size < 1024 * 1024:
-                size_str = f"{total_size / 1024:.1f} KB"
-            elif total_size < 1024 * 1024 * 1024:
-                size_str = f"{total_size / (1024 * 1024):.1f} MB"
-            else:
-                size_str = f"{total_size / (1024 * 1024 * 1024):.1f} GB"
+            # Get attributes properly
+            attr_count = schema.nattr
+            first_attr = schema.attr(0) if attr_count > 0 else None
+            compression = str(first_attr.filters) if first_attr else "none"
             
-            # Get array schema info
-            with tiledb.open(array_path) as array:
-                schema = array.schema
-                
-                # Get attributes properly
-                attr_count = len(list(schema))
-                first_attr = list(schema)[0] if attr_count > 0 else None
-                compression = str(first_attr.filters) if first_attr else "none"
-                
-                return {
-                    "array_name": array_name,
-                    "size_on_disk": size_str,
-                    "size_bytes": total_size,
-                    "fragment_count": fragment_count,
-                    "array_type": "sparse" if schema.sparse else "dense",
-                    "dimensions": len(schema.domain),
-                    "attributes": attr_count,
-                    "compression": compression
-                }
+            info = {
+                "array_name": array_name,
+                "size_on_disk": _fmt_size(total_size),
+                "size_bytes": total_size,
+                "fragment_count": fragment_count,
+                "array_type": "sparse" if schema.sparse else "dense",
+                "dimensions": len(schema.domain),
+                "attributes": attr_count,
+                "compression": compression
+            }
+            
+            self._info_cache[array_path] = (state, info)
+            return info
                 
         except Exception as e:
             return {"error": f"Error getting info for {array_name}: {e}"}
     
+    def _fast_info(self, array_name: str) -> dict:
+        """Fragment count and size of an array, without opening its schema"""
+        array_path = self._workspace_prefix + array_name
+        
+        state = _array_state(array_path)
+        if state[0] is None:
+            return {"error": f"Array {array_name} does not exist"}
+        
+        for cache in (self._info_cache, self._fast_info_cache):
+            cached = cache.get(array_path)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+        
+        try:
+            total_size, fragment_count = _array_size(array_path, self.ctx)
+        except Exception as e:
+            return {"error": f"Error getting info for {array_name}: {e}"}
+        
+        info = {
+            "array_name": array_name,
+            "size_on_disk": _fmt_size(total_size),
+            "size_bytes": total_size,
+            "fragment_count": fragment_count
+        }
+        self._fast_info_cache[array_path] = (state, info)
+        return info
+    
+    def _needs_consolidation(self, array_name: str) -> bool:
+        """Whether the array has at least min_fragments fragments (arrays with unreadable info are attempted)"""
+        info = self._fast_info(array_name)
+        return "error" in info or info["fragment_count"] >= self.min_fragments
+    
+    def _iter_arrays(self) -> Iterator[Tuple[str, str]]:
+        """Yield (name, path) of every TileDB array (a directory with a __schema directory) in the workspace"""
+        with os.scandir(self.workspace_path) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    with os.scandir(entry.path) as children:
+                        has_schema = any(child.name == '__schema' and child.is_dir() for child in children)
+                except OSError:
+                    continue
+                if has_schema:
+                    yield entry.name, entry.path
+    
     def optimize_all_arrays(self) -> List[dict]:
         """Consolidate and optimize all arrays in workspace"""
-        results = []
-        
+        return list(self.iter_optimize_all_arrays())
+    
+    def iter_optimize_all_arrays(self) -> Iterator[dict]:
+        """Consolidate all arrays in workspace, yielding each array's result as it finishes"""
         if not os.path.exists(self.workspace_path):
             logger.error(f"Workspace does not exist: {self.workspace_path}")
-            return results
+            return
         
         # Find all TileDB arrays in workspace
-        for item in os.listdir(self.workspace_path):
-            item_path = os.path.join(self.workspace_path, item)
-            
-            # Check if it's a TileDB array (has __schema directory)
-            schema_dir = os.path.join(item_path, "__schema")
-            if os.path.isdir(item_path) and os.path.exists(schema_dir):
-                logger.info(f"Found TileDB array: {item}")
-                
-                # Get info before optimization
-                before_info = self.get_array_info(item)
-                
-                # Consolidate array
-                success = self.consolidate_array(item)
-                
-                # Get info after optimization
-                after_info = self.get_array_info(item)
-                
-                results.append({
-                    "array_name": item,
-                    "success": success,
-                    "before": before_info,
-                    "after": after_info
-                })
+        arrays = []
+        for item, _ in self._iter_arrays():
+            logger.info(f"Found TileDB array: {item}")
+            arrays.append(item)
+        
+        if self.parallelism <= 1 or len(arrays) <= 1:
+            for item in arrays:
+                yield self._optimize_array(item)
+            return
         
-        return results
+        # Consolidation runs in TileDB's C++ core with the GIL released, so arrays overlap on threads
+        with ThreadPoolExecutor(max_workers=min(len(arrays), self.parallelism)) as executor:
+            yield from executor.map(self._optimize_array, arrays)
+    
+    def _optimize_array(self, array_name: str) -> dict:
+        """Consolidate one array, recording its info before and after"""
+        # Only the size and fragment count are compared, so skip the schema before optimization
+        before_info = self._fast_info(array_name)
+        
+        # Consolidation rewrites the whole array, so arrays that are already compact are skipped
+        if not self._needs_consolidation(array_name):
+            logger.info(f"Skipping {array_name}: {before_info['fragment_count']} fragments (minimum {self.min_fragments})")
+            return {
+                "array_name": array_name,
+                "success": True,
+                "skipped": True,
+                "before": before_info,
+                "after": before_info
+            }
+        
+        # Consolidate array
+        success = self.consolidate_array(array_name)
+        
+        # Get info after optimization
+        after_info = self.get_array_info(array_name)
+        
+        return {
+            "array_name": array_name,
+            "success": success,
+            "before": before_info,
+            "after": after_info
+        }
     
     def print_workspace_summary(self):
         """Print summary of all arrays in workspace"""
@@ -142,59 +365,66 @@ class TileDBMaintenance:
         total_size = 0
         array_count = 0
         
-        for item in os.listdir(self.workspace_path):
-            item_path = os.path.join(self.workspace_path, item)
-            schema_dir = os.path.join(item_path, "__schema")
+        for item, _ in self._iter_arrays():
+            array_count += 1
+            info = self.get_array_info(item)
             
-            if os.path.isdir(item_path) and os.path.exists(schema_dir):
-                array_count += 1
-                info = self.get_array_info(item)
+            if "error" not in info:
+                print(f"📊 {info['array_name']}")
+                print(f"   Size: {info['size_on_disk']}")
+                print(f"   Type: {info['array_type']}")
+                print(f"   Dimensions: {info['dimensions']}")
+                print(f"   Attributes: {info['attributes']}")
+                print(f"   Fragments: {info['fragment_count']}")
+                print()
                 
-                if "error" not in info:
-                    print(f"📊 {info['array_name']}")
-                    print(f"   Size: {info['size_on_disk']}")
-                    print(f"   Type: {info['array_type']}")
-                    print(f"   Dimensions: {info['dimensions']}")
-                    print(f"   Attributes: {info['attributes']}")
-                    print(f"   Fragments: {info['fragment_count']}")
-                    print()
-                    
-                    total_size += info['size_bytes']
-                else:
-                    print(f"❌ {item}: {info['error']}")
-        
-        # Format total size
-        if total_size < 1024 * 1024 * 1024:
-            total_size_str = f"{total_size / (1024 * 1024):.1f} MB"
-        else:
-            total_size_str = f"{total_size / (1024 * 1024 * 1024):.1f} GB"
+                total_size += info['size_bytes']
+            else:
+                print(f"❌ {item}: {info['error']}")
         
-        print(f"📈 Total: {array_count} arrays, {total_size_str}")
+        print(f"📈 Total: {array_count} arrays, {_fmt_size(total_size)}")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python maintenance.py <workspace_path> [command]")
-        print("Commands:")
-        print("  info     - Show workspace information (default)")
-        print("  optimize - Consolidate and optimize all arrays")
-        print("  array <name> - Optimize specific array")
-        sys.exit(1)
+    # --verbose is accepted before or after the command; SUPPRESS keeps a subcommand from resetting it
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--verbose', action='store_true', default=argparse.SUPPRESS,
+                        help='Log every consolidation step')
+    
+    parser = argparse.ArgumentParser(description='Consolidate and vacuum TileDB arrays', parents=[common])
+    parser.add_argument('workspace_path', help='Path to TileDB workspace directory')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.add_parser('info', parents=[common], help='Show workspace information (default)')
+    optimize_parser = commands.add_parser('optimize', parents=[common], help='Consolidate and optimize all arrays')
+    optimize_parser.add_argument('--parallelism', type=int, default=1, help='Arrays to optimize at once')
+    optimize_parser.add_argument('--min-fragments', type=int, default=MIN_FRAGMENTS,
+                                 help='Skip arrays with fewer fragments than this')
+    array_parser = commands.add_parser('array', parents=[common], help='Optimize specific array')
+    array_parser.add_argument('name', help='Array name within the workspace')
     
-    workspace_path = sys.argv[1]
-    command = sys.argv[2] if len(sys.argv) > 2 else "info"
+    args = parser.parse_args()
+    command = args.command or 'info'
     
-    maintenance = TileDBMaintenance(workspace_path)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if getattr(args, 'verbose', False):
+        logger.setLevel(logging.DEBUG)
+    
+    maintenance = TileDBMaintenance(args.workspace_path,
+                                    parallelism=getattr(args, 'parallelism', 1),
+                                    min_fragments=getattr(args, 'min_fragments', MIN_FRAGMENTS))
     
     if command == "info":
         maintenance.print_workspace_summary()
         
     elif command == "optimize":
         print("🔧 Optimizing all TileDB arrays...")
-        results = maintenance.optimize_all_arrays()
-        
         print("\n📊 Optimization Results:")
         print("=" * 80)
-        for result in results:
+        for result in maintenance.iter_optimize_all_arrays():
+            if result.get("skipped"):
+                print(f"⏭️  {result['array_name']} ({result['before']['fragment_count']} fragments, skipped)")
+                print()
+                continue
+            
             status = "✅" if result["success"] else "❌"
             print(f"{status} {result['array_name']}")
             
@@ -211,8 +441,8 @@ def main():
                 print(f"   Fragments: {result['before']['fragment_count']} → {result['after']['fragment_count']}")
             print()
         
-    elif command == "array" and len(sys.argv) > 3:
-        array_name = sys.argv[3]
+    elif command == "array":
+        array_name = args.name
         print(f"🔧 Optimizing array: {array_name}")
         
         before_info = maintenance.get_array_info(array_name)
@@ -226,10 +456,6 @@ def main():
                 print(f"Fragments: {before_info['fragment_count']} → {after_info['fragment_count']}")
         else:
             print(f"❌ Failed to optimize {array_name}")
-    
-    else:
-        print(f"Unknown command: {command}")
-        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,16 +7,29 @@ Persistent Python process that keeps TileDB arrays open for fast queries
 import tiledb
 import numpy as np
 import json
+import io
+import math
+import importlib.util
 import sys
 import os
+import queue
+import selectors
 import socket
+import struct
 import threading
 import time
 import logging
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
 import signal
 import atexit
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging to a file to avoid interfering with JSON communication
 log_file = '/tmp/tiledb/daemon.log'
 os.makedirs(os.path.dirname(log_file), exist_ok=True)
@@ -30,6 +43,156 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Population frequencies are stored as uint16 log10-scale codes (see gnomad-processor.py):
+# code 0 is AF 0 and codes 1-65535 span AF 1e-8 to 1
+AF_LOG10_MIN = -8.0
+AF_CODE_MAX = 65535
+
+def decode_allele_frequencies(codes) -> np.ndarray:
+    """Decode stored population frequency codes back to allele frequencies"""
+    codes = np.asarray(codes, dtype=np.float64)
+    af = 10.0 ** (AF_LOG10_MIN + (codes - 1) * (-AF_LOG10_MIN / (AF_CODE_MAX - 1)))
+    return np.where(codes > 0, af, 0.0)
+
+# Every code decoded once, so single lookups are a table index
+AF_DECODE_TABLE = decode_allele_frequencies(np.arange(AF_CODE_MAX + 1)).tolist()
+
+def decode_allele_frequency(code) -> float:
+    """Decode a single stored population frequency code back to an allele frequency"""
+    return AF_DECODE_TABLE[int(code)]
+
+# Per-row info/samples decoding and response encoding use orjson when it is installed
+if orjson is not None:
+    json_loads = orjson.loads
+    
+    def encode_response(obj) -> bytes:
+        """Serialize a response to UTF-8 JSON, including NumPy scalars and arrays"""
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+else:
+    json_loads = json.loads
+    
+    def encode_response(obj) -> bytes:
+        """Serialize a response to UTF-8 JSON"""
+        return json.dumps(obj).encode('utf-8')
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL; concurrent misses on a key share one computation"""
+    
+    def __init__(self, ttl: float, max_size: int = 128):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> (value, expiry time), least recently used first
+        self._in_flight = {}  # key -> Event set when the computing thread finishes
+    
+    def get(self, key) -> Optional[Any]:
+        """Cached value for key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def insert(self, key, value, ttl: Optional[float] = None):
+        """Cache value for key, evicting the least recently used entries beyond max_size"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def get_or_compute(self, key, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Cached value for key, computing it in one thread while other callers wait for the result"""
+        while True:
+            with self._lock:
+                value = self.get(key)
+                if value is not None:
+                    return value
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            # Another thread is computing; take its result, or compute here if it failed
+            event.wait()
+        
+        try:
+            value = compute()
+            self.insert(key, value, ttl)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+# Requests and responses are framed as a 4-byte little-endian payload length followed by the JSON payload
+FRAME_HEADER = struct.Struct('<I')
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# Connections stay open for further requests until the client closes them or leaves them idle this
+# long. An idle connection waits in the accept loop's selector and holds one of the CLIENT_WORKERS
+# threads only while a request is read, executed and answered, so open connections are limited by
+# the file descriptor limit rather than the pool: at most CLIENT_WORKERS requests run at once and
+# further ready connections queue for the next free thread
+CLIENT_WORKERS = max(4, (os.cpu_count() or 1) * 2)
+CONNECTION_IDLE_TIMEOUT = 60
+
+# Time allowed for the rest of a request (or the response write) once a connection is readable
+REQUEST_IO_TIMEOUT = 10
+
+# How often the accept loop checks for connections past their idle timeout
+IDLE_SWEEP_INTERVAL = 1.0
+
+# Send/receive buffer size for client connections; large enough that a typical framed response
+# is written in a few syscalls without holding the kernel default (~208 KiB) per idle connection
+SOCKET_BUFFER_SIZE = 64 * 1024
+
+def read_frame(reader: io.BufferedReader) -> Optional[bytes]:
+    """Read one framed payload from a buffered socket reader, or None if the peer closes the connection first"""
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_REQUEST_SIZE:
+        raise ValueError(f"Rejecting {length}-byte request (limit {MAX_REQUEST_SIZE})")
+    data = reader.read(length)
+    if len(data) < length:
+        return None
+    return data
+
+# Array state key and size walk shared with maintenance.py, which caches array sizes the same way
+MAINTENANCE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maintenance.py')
+_maintenance_spec = importlib.util.spec_from_file_location('maintenance', MAINTENANCE_SCRIPT)
+maintenance = importlib.util.module_from_spec(_maintenance_spec)
+_maintenance_spec.loader.exec_module(maintenance)
+
+# Point-in-gene interval index written next to the gene regions array by gene-processor.py
+GENE_PROCESSOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'annotation', 'gene-processor.py')
+GENE_INDEX_FILE = 'gene_regions_index.npz'
+
+def load_gene_interval_index(index_path: str):
+    """Load a GeneIntervalIndex saved by gene-processor.py"""
+    spec = importlib.util.spec_from_file_location('gene_processor', GENE_PROCESSOR_SCRIPT)
+    gene_processor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gene_processor)
+    return gene_processor.GeneIntervalIndex.load(index_path)
+
+# Gene region attributes returned with each gene_lookup_at hit
+GENE_RESPONSE_ATTRS = ['gene_name', 'gene_id', 'gene_type', 'end', 'strand', 'transcript_count', 'clinical_significance']
+
+# Variant attributes returned by query_variants; the typed af/dp/gt copies are not read there
+VARIANT_RESPONSE_ATTRS = ['ref', 'alt', 'qual', 'filter', 'info', 'samples']
+
+# Population attributes returned by population_frequency_lookup (ref/alt also select the allele)
+POPULATION_RESPONSE_ATTRS = [
+    'ref', 'alt', 'af_global', 'af_afr', 'af_amr', 'af_asj', 'af_eas', 'af_fin', 'af_nfe', 'af_oth',
+    'ac_global', 'an_global', 'nhomalt_global', 'faf95_global', 'is_common'
+]
+
 class TileDBQueryDaemon:
     def __init__(self, workspace_path: str, socket_path: str):
         self.workspace_path = workspace_path
@@ -39,9 +202,20 @@ class TileDBQueryDaemon:
         self.population_array = None  # New: population frequency array
         self.gene_regions_array = None  # New: gene regions array
         self.gene_features_array = None  # New: gene features array
-        self.stats_cache = {}
+        self.gene_index = None  # Gene interval index for point-in-gene lookups
+        self.has_genotype_codes = False  # Variants array stores GT alleles in the typed gt attribute
         self.cache_ttl = 300  # 5 minutes
+        self.stats_cache = TTLCache(self.cache_ttl)
+        self.array_size_cache = {}  # Array path -> (array state, size in bytes)
+        self.encoded_stats = {}  # Stats cache key -> (stats dict, its encoded response)
         self.running = False
+        self.client_pool = ThreadPoolExecutor(max_workers=CLIENT_WORKERS, thread_name_prefix='daemon-client')
+        self.client_sockets = set()  # Open client connections, shut down on cleanup
+        self.client_sockets_lock = threading.Lock()
+        self.served_connections = queue.SimpleQueue()  # (socket, reader) handed back to the accept loop
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()  # Wakes the accept loop for served_connections
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
         
         # Chromosome mapping - consistent with existing code
         self.chrom_map = {
@@ -54,6 +228,8 @@ class TileDBQueryDaemon:
             **{i: f'chr{i}' for i in range(1, 23)},
             23: 'chrX', 24: 'chrY', 25: 'chrMT'
         }
+        # reverse_chrom_map as an array indexed by chrom id, for mapping whole result columns at once
+        self.chrom_str_arr = np.array([self.reverse_chrom_map.get(i, str(i)) for i in range(26)], dtype=object)
         
         # Register cleanup handlers
         signal.signal(signal.SIGTERM, self._cleanup_handler)
@@ -74,6 +250,7 @@ class TileDBQueryDaemon:
             
             if os.path.exists(variants_path):
                 self.variants_array = tiledb.open(variants_path, 'r')
+                self.has_genotype_codes = self.variants_array.schema.has_attr('gt')
                 logger.info("Opened variants array")
             else:
                 logger.error(f"Variants array not found at {variants_path}")
@@ -99,6 +276,16 @@ class TileDBQueryDaemon:
                 logger.info("Opened gene regions array")
             else:
                 logger.info(f"Gene regions array not found at {gene_regions_path} (optional)")
+            
+            gene_index_path = os.path.join(self.workspace_path, 'gene_arrays', GENE_INDEX_FILE)
+            if os.path.exists(gene_index_path):
+                try:
+                    self.gene_index = load_gene_interval_index(gene_index_path)
+                    logger.info("Loaded gene interval index")
+                except Exception as e:
+                    logger.error(f"Failed to load gene interval index: {e}")
+            else:
+                logger.info(f"Gene interval index not found at {gene_index_path} (optional)")
                 
             if os.path.exists(gene_features_path):
                 self.gene_features_array = tiledb.open(gene_features_path, 'r')
@@ -126,44 +313,62 @@ class TileDBQueryDaemon:
             end_pos = query_params.get('end', 300_000_000)
             limit = query_params.get('limit', 100)
             
+            # minQual and ref are evaluated inside TileDB, so rejected cells are never returned
+            conditions = []
+            if 'minQual' in query_params and query_params['minQual'] is not None:
+                # nan/inf would render as bare names the condition parser rejects
+                try:
+                    min_qual = float(query_params['minQual'])
+                except (TypeError, ValueError):
+                    min_qual = math.nan
+                if not math.isfinite(min_qual):
+                    return {"error": f"minQual must be a finite number, got {query_params['minQual']!r}"}
+                # Missing (null) and zero quality mean no quality, which never passes
+                conditions.append(f"qual > 0.0 and qual >= {min_qual!r}")
+            if 'ref' in query_params and query_params['ref']:
+                conditions.append(f"ref == {str(query_params['ref'])!r}")
+            cond = ' and '.join(conditions) if conditions else None
+            
             # Execute query
+            query = self.variants_array.query(attrs=VARIANT_RESPONSE_ATTRS, cond=cond)
             if chrom_val is not None:
-                result = self.variants_array[chrom_val:chrom_val+1, start_pos:end_pos]
+                result = query[chrom_val:chrom_val+1, start_pos:end_pos]
             else:
-                result = self.variants_array[1:26, start_pos:end_pos]
+                result = query[1:26, start_pos:end_pos]
             
-            # Process results
+            # Alt membership in the comma-separated list is checked on the whole column at once,
+            # then dicts are built only for the first `limit` matches
             variants = []
             if result['chrom'].size > 0:
-                result_count = min(result['chrom'].size, limit)
-                for i in range(result_count):
-                    chrom_str = self.reverse_chrom_map.get(result['chrom'][i], str(result['chrom'][i]))
-                    
-                    variant = {
+                if 'alt' in query_params and query_params['alt']:
+                    alt = str(query_params['alt'])
+                    alt_values = result['alt'].astype(str)
+                    # An exact match, or the alt as a whole entry of a multi-allelic list (only
+                    # rows with a comma need the delimited search)
+                    mask = alt_values == alt
+                    multi = np.flatnonzero(np.char.find(alt_values, ',') >= 0)
+                    if ',' in alt:
+                        mask[:] = False  # A single allele never contains a comma
+                    elif multi.size:
+                        delimited = np.char.add(np.char.add(',', alt_values[multi]), ',')
+                        mask[multi] |= np.char.find(delimited, f',{alt},') >= 0
+                    indices = np.flatnonzero(mask)
+                else:
+                    indices = np.arange(result['chrom'].size)
+                
+                selected = indices[:limit]
+                chrom_strs = self.chrom_str_arr[result['chrom'][selected]]
+                for i, chrom_str in zip(selected, chrom_strs):
+                    variants.append({
                         'chrom': chrom_str,
                         'pos': int(result['pos'][i]),
                         'ref': result['ref'][i],
                         'alt': result['alt'][i].split(',') if result['alt'][i] else [],
                         'qual': float(result['qual'][i]) if result['qual'][i] > 0 else None,
                         'filter': result['filter'][i].split(',') if result['filter'][i] else [],
-                        'info': json.loads(result['info'][i]) if result['info'][i] else {},
-                        'samples': json.loads(result['samples'][i]) if result['samples'][i] else {}
-                    }
-                    
-                    # Apply filters
-                    if 'minQual' in query_params and query_params['minQual'] is not None:
-                        if variant['qual'] is None or variant['qual'] < query_params['minQual']:
-                            continue
-                    
-                    if 'ref' in query_params and query_params['ref']:
-                        if variant['ref'] != query_params['ref']:
-                            continue
-                    
-                    if 'alt' in query_params and query_params['alt']:
-                        if query_params['alt'] not in variant['alt']:
-                            continue
-                    
-                    variants.append(variant)
+                        'info': json_loads(result['info'][i]) if result['info'][i] else {},
+                        'samples': json_loads(result['samples'][i]) if result['samples'][i] else {}
+                    })
             
             return {"variants": variants, "count": len(variants)}
             
@@ -173,76 +378,76 @@ class TileDBQueryDaemon:
 
     def get_array_stats(self) -> Dict[str, Any]:
         """Get cached array statistics"""
-        cache_key = "array_stats"
-        current_time = time.time()
-        
-        # Check cache
-        if cache_key in self.stats_cache:
-            cached_data, timestamp = self.stats_cache[cache_key]
-            if current_time - timestamp < self.cache_ttl:
-                return cached_data
-        
         try:
             if not self.variants_array:
                 return {"error": "Variants array not initialized"}
             
-            # Get non-empty domain safely
-            try:
-                non_empty = self.variants_array.nonempty_domain()
-            except Exception as e:
-                logger.error(f"Error getting nonempty domain: {e}")
-                non_empty = None
-            
-            if non_empty:
-                chrom_range = non_empty[0]
-                pos_range = non_empty[1]
-                
-                chromosomes = []
-                for i in range(int(chrom_range[0]), int(chrom_range[1]) + 1):
-                    if i in self.reverse_chrom_map:
-                        chromosomes.append(self.reverse_chrom_map[i])
-                
-                # Use known import count (most accurate)
-                total_variants = 38821856
-                
-                # Get array size on disk
-                array_path = os.path.join(self.workspace_path, 'variants')
-                array_size = sum(
-                    os.path.getsize(os.path.join(dirpath, filename))
-                    for dirpath, dirnames, filenames in os.walk(array_path)
-                    for filename in filenames
-                )
-                
-                # Format size
-                if array_size < 1024 * 1024 * 1024:
-                    size_str = f"{array_size / (1024 * 1024):.1f} MB"
-                else:
-                    size_str = f"{array_size / (1024 * 1024 * 1024):.1f} GB"
-                
-                stats = {
-                    'totalVariants': total_variants,
-                    'chromosomes': chromosomes,
-                    'positionRange': [int(pos_range[0]), int(pos_range[1])],
-                    'sampleCount': 1,
-                    'arraySize': size_str
-                }
-            else:
-                stats = {
-                    'totalVariants': 0,
-                    'chromosomes': [],
-                    'positionRange': [0, 0],
-                    'sampleCount': 0,
-                    'arraySize': '0 B'
-                }
-            
-            # Cache the result
-            self.stats_cache[cache_key] = (stats, current_time)
-            return stats
+            # Concurrent misses wait for one computation instead of each scanning the array
+            return self.stats_cache.get_or_compute("array_stats", self._compute_array_stats)
             
         except Exception as e:
             logger.error(f"Error getting array stats: {e}")
             return {"error": str(e)}
 
+    def _compute_array_stats(self) -> Dict[str, Any]:
+        """Compute array statistics for the stats cache"""
+        # Get non-empty domain safely
+        try:
+            non_empty = self.variants_array.nonempty_domain()
+        except Exception as e:
+            logger.error(f"Error getting nonempty domain: {e}")
+            non_empty = None
+        
+        if non_empty:
+            chrom_range = non_empty[0]
+            pos_range = non_empty[1]
+            
+            chromosomes = []
+            for i in range(int(chrom_range[0]), int(chrom_range[1]) + 1):
+                if i in self.reverse_chrom_map:
+                    chromosomes.append(self.reverse_chrom_map[i])
+            
+            # Use known import count (most accurate)
+            total_variants = 38821856
+            
+            # Get array size on disk
+            array_size = self.get_array_size(os.path.join(self.workspace_path, 'variants'))
+            
+            # Format size
+            if array_size < 1024 * 1024 * 1024:
+                size_str = f"{array_size / (1024 * 1024):.1f} MB"
+            else:
+                size_str = f"{array_size / (1024 * 1024 * 1024):.1f} GB"
+            
+            stats = {
+                'totalVariants': total_variants,
+                'chromosomes': chromosomes,
+                'positionRange': [int(pos_range[0]), int(pos_range[1])],
+                'sampleCount': 1,
+                'arraySize': size_str
+            }
+        else:
+            stats = {
+                'totalVariants': 0,
+                'chromosomes': [],
+                'positionRange': [0, 0],
+                'sampleCount': 0,
+                'arraySize': '0 B'
+            }
+        
+        return stats
+
+    def get_array_size(self, array_path: str) -> int:
+        """Size of an array on disk, walked again only after the array has been written or consolidated"""
+        state = maintenance._array_state(array_path)
+        cached = self.array_size_cache.get(array_path)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        
+        array_size, _ = maintenance._dir_size(array_path)
+        self.array_size_cache[array_path] = (state, array_size)
+        return array_size
+
     def calculate_allele_frequency(self, chrom: str, pos: int, ref: str, alt: str) -> float:
         """Calculate allele frequency for a specific variant"""
         try:
@@ -250,31 +455,40 @@ class TileDBQueryDaemon:
                 return 0.0
             
             chrom_num = self.chrom_map.get(chrom, 1)
-            result = self.variants_array[chrom_num:chrom_num+1, pos:pos+1]
             
-            if result['chrom'].size > 0:
-                for i in range(result['chrom'].size):
-                    if (result['chrom'][i] == chrom_num and 
-                        result['pos'][i] == pos and 
-                        result['ref'][i] == ref and 
-                        alt in result['alt'][i].split(',')):
-                        
-                        samples_data = json.loads(result['samples'][i])
-                        total_alleles = 0
-                        alt_alleles = 0
-                        
-                        for sample_name, genotypes in samples_data.items():
-                            gt = genotypes.get('GT', './.')
-                            if gt != './.':
-                                alleles = gt.replace('|', '/').split('/')
-                                for allele in alleles:
-                                    if allele != '.':
-                                        total_alleles += 1
-                                        if allele != '0':
-                                            alt_alleles += 1
-                        
-                        if total_alleles > 0:
-                            return alt_alleles / total_alleles
+            # Arrays with the typed gt attribute skip reading and parsing the samples JSON
+            attrs = ['ref', 'alt', 'gt'] if self.has_genotype_codes else ['ref', 'alt', 'samples']
+            # Point query: every returned row is at (chrom, pos), so only ref/alt are left to match
+            result = self.variants_array.query(attrs=attrs, dims=False).multi_index[chrom_num, pos]
+            
+            for i in np.flatnonzero(result['ref'] == ref):
+                if alt not in result['alt'][i].split(','):
+                    continue
+                
+                if self.has_genotype_codes:
+                    # Called alleles are >= 0 ('.' is -1); any non-reference allele counts as alt
+                    codes = result['gt'][i]
+                    total_alleles = int(np.count_nonzero(codes >= 0))
+                    if total_alleles > 0:
+                        return int(np.count_nonzero(codes > 0)) / total_alleles
+                    continue
+                
+                samples_data = json_loads(result['samples'][i])
+                total_alleles = 0
+                alt_alleles = 0
+                
+                for sample_name, genotypes in samples_data.items():
+                    gt = genotypes.get('GT', './.')
+                    if gt != './.':
+                        alleles = gt.replace('|', '/').split('/')
+                        for allele in alleles:
+                            if allele != '.':
+                                total_alleles += 1
+                                if allele != '0':
+                                    alt_alleles += 1
+                
+                if total_alleles > 0:
+                    return alt_alleles / total_alleles
             
             return 0.0
             
@@ -290,38 +504,13 @@ class TileDBQueryDaemon:
             
             chrom_num = self.chrom_map.get(chrom, 1)
             
-            # Query exact position
-            result = self.population_array[chrom_num:chrom_num+1, pos:pos+1]
+            # Point query on the exact position (all alleles at that site)
+            result = self.population_array.query(attrs=POPULATION_RESPONSE_ATTRS, dims=False).multi_index[chrom_num, pos]
             
             # Find matching variant
-            if result['chrom'].size > 0:
-                for i in range(result['chrom'].size):
-                    if (result['chrom'][i] == chrom_num and 
-                        result['pos'][i] == pos and 
-                        result['ref'][i] == ref and 
-                        result['alt'][i] == alt):
-                        
-                        return {
-                            "variants": [{
-                                "chrom": chrom,
-                                "pos": pos,
-                                "ref": ref,
-                                "alt": alt,
-                                "af_global": float(result['af_global'][i]),
-                                "af_afr": float(result['af_afr'][i]),
-                                "af_amr": float(result['af_amr'][i]),
-                                "af_asj": float(result['af_asj'][i]),
-                                "af_eas": float(result['af_eas'][i]),
-                                "af_fin": float(result['af_fin'][i]),
-                                "af_nfe": float(result['af_nfe'][i]),
-                                "af_oth": float(result['af_oth'][i]),
-                                "ac_global": int(result['ac_global'][i]),
-                                "an_global": int(result['an_global'][i]),
-                                "nhomalt_global": int(result['nhomalt_global'][i]),
-                                "faf95_global": float(result['faf95_global'][i]),
-                                "is_common": bool(result['is_common'][i])
-                            }]
-                        }
+            matches = np.flatnonzero((result['ref'] == ref) & (result['alt'] == alt))
+            if matches.size > 0:
+                return {"variants": [self._population_variant(result, matches[0], chrom, pos, ref, alt)]}
             
             # Variant not found
             return {"variants": []}
@@ -330,66 +519,184 @@ class TileDBQueryDaemon:
             logger.error(f"Error looking up population frequency: {e}")
             return {"error": str(e), "variants": []}
 
-    def get_population_stats(self) -> Dict[str, Any]:
-        """Get population frequency array statistics"""
+    def lookup_population_frequencies(self, variants: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Look up population frequencies for many variants, one point query per chromosome"""
         try:
             if not self.population_array:
                 return {"error": "Population frequency array not available"}
             
-            # Get cached stats if available
-            cache_key = "population_stats"
-            current_time = time.time()
-            
-            if cache_key in self.stats_cache:
-                cached_data, timestamp = self.stats_cache[cache_key]
-                if current_time - timestamp < self.cache_ttl:
-                    return cached_data
-            
-            # Count total variants (estimate from non-empty domain)
-            try:
-                non_empty = self.population_array.nonempty_domain()
-                # This is an estimate - actual counting would be too slow
-                estimated_variants = 750_000_000  # gnomAD v4.1 has ~750M variants
-            except:
-                estimated_variants = 0
-            
-            # Count common variants by querying is_common attribute
-            try:
-                # Query a sample to estimate common variant ratio
-                sample_result = self.population_array[1:2, 1:100000]
-                if sample_result['is_common'].size > 0:
-                    common_ratio = np.mean(sample_result['is_common'])
-                    estimated_common = int(estimated_variants * common_ratio)
-                else:
-                    estimated_common = 0
-            except:
-                estimated_common = 0
+            # Input indices grouped by chromosome; each group's positions go into one multi-range query
+            by_chrom: Dict[int, List[int]] = {}
+            for n, variant in enumerate(variants):
+                by_chrom.setdefault(self.chrom_map.get(variant.get('chrom'), 1), []).append(n)
             
-            stats = {
-                "total_variants": estimated_variants,
-                "common_variants": estimated_common,
-                "rare_variants": estimated_variants - estimated_common,
-                "array_available": True
-            }
+            query = self.population_array.query(attrs=POPULATION_RESPONSE_ATTRS)
+            found: List[Optional[Dict[str, Any]]] = [None] * len(variants)
+            for chrom_num, indices in by_chrom.items():
+                positions = sorted({int(variants[n]['pos']) for n in indices})
+                result = query.multi_index[chrom_num, positions]
+                
+                # First row for each (pos, ref, alt), as in the single lookup
+                rows = {}
+                for i, key in enumerate(zip(result['pos'].tolist(), result['ref'], result['alt'])):
+                    rows.setdefault(key, i)
+                
+                for n in indices:
+                    variant = variants[n]
+                    i = rows.get((int(variant['pos']), variant.get('ref'), variant.get('alt')))
+                    if i is not None:
+                        found[n] = self._population_variant(result, i, variant['chrom'], variant['pos'], variant['ref'], variant['alt'])
+            
+            return {"variants": found}
+            
+        except Exception as e:
+            logger.error(f"Error looking up population frequencies: {e}")
+            return {"error": str(e), "variants": []}
+
+    def _population_variant(self, result: Dict[str, np.ndarray], i: int, chrom: str, pos: int, ref: str, alt: str) -> Dict[str, Any]:
+        """Population frequency record for row i of a population array query"""
+        return {
+            "chrom": chrom,
+            "pos": pos,
+            "ref": ref,
+            "alt": alt,
+            "af_global": decode_allele_frequency(result['af_global'][i]),
+            "af_afr": decode_allele_frequency(result['af_afr'][i]),
+            "af_amr": decode_allele_frequency(result['af_amr'][i]),
+            "af_asj": decode_allele_frequency(result['af_asj'][i]),
+            "af_eas": decode_allele_frequency(result['af_eas'][i]),
+            "af_fin": decode_allele_frequency(result['af_fin'][i]),
+            "af_nfe": decode_allele_frequency(result['af_nfe'][i]),
+            "af_oth": decode_allele_frequency(result['af_oth'][i]),
+            "ac_global": int(result['ac_global'][i]),
+            "an_global": int(result['an_global'][i]),
+            "nhomalt_global": int(result['nhomalt_global'][i]),
+            "faf95_global": decode_allele_frequency(result['faf95_global'][i]),
+            "is_common": bool(result['is_common'][i])
+        }
+
+    def lookup_genes_at(self, chrom: str, pos: int) -> Dict[str, Any]:
+        """Find the genes overlapping a position with the gene interval index"""
+        try:
+            if self.gene_index is None:
+                return {"error": "Gene interval index not available", "genes": []}
+            
+            chrom_num = self.chrom_map.get(chrom)
+            if chrom_num is None:
+                return {"genes": []}
+            
+            index = self.gene_index
+            hits = index.find_overlaps(chrom_num, int(pos))
+            genes = [
+                {
+                    "gene_name": str(index.gene_names[i]),
+                    "gene_id": str(index.gene_ids[i]),
+                    "chrom": self.reverse_chrom_map[chrom_num],
+                    "start": int(index.starts[i]),
+                    "end": int(index.ends[i])
+                }
+                for i in hits
+            ]
+            
+            # The index holds coordinates only; the other gene fields come from one point query on the hits' starts
+            if genes and self.gene_regions_array is not None:
+                result = self.gene_regions_array.query(attrs=GENE_RESPONSE_ATTRS).multi_index[
+                    chrom_num, sorted({gene["start"] for gene in genes})
+                ]
+                rows = {(int(start), str(name)): i for i, (start, name) in enumerate(zip(result['start'], result['gene_name']))}
+                for gene in genes:
+                    i = rows.get((gene["start"], gene["gene_name"]))
+                    if i is not None:
+                        gene.update({
+                            "gene_type": str(result['gene_type'][i]),
+                            "strand": str(result['strand'][i]),
+                            "transcript_count": int(result['transcript_count'][i]),
+                            "clinical_significance": str(result['clinical_significance'][i]) or None
+                        })
+            
+            return {"genes": genes}
+            
+        except Exception as e:
+            logger.error(f"Error looking up genes at position: {e}")
+            return {"error": str(e), "genes": []}
+
+    def get_population_stats(self) -> Dict[str, Any]:
+        """Get population frequency array statistics"""
+        try:
+            if not self.population_array:
+                return {"error": "Population frequency array not available"}
             
-            # Cache the result
-            self.stats_cache[cache_key] = (stats, current_time)
-            return stats
+            return self.stats_cache.get_or_compute("population_stats", self._compute_population_stats)
             
         except Exception as e:
             logger.error(f"Error getting population stats: {e}")
             return {"error": str(e)}
 
-    def handle_request(self, request_data: str) -> str:
+    def _compute_population_stats(self) -> Dict[str, Any]:
+        """Compute population frequency statistics for the stats cache"""
+        # Counts recorded by gnomad-processor.py at ingest time; arrays ingested before that fall back to sampling
+        meta = self.population_array.meta
+        if 'common_variants' in meta and 'total_variants' in meta:
+            total_variants = int(meta['total_variants'])
+            common_variants = int(meta['common_variants'])
+            return {
+                "total_variants": total_variants,
+                "common_variants": common_variants,
+                "rare_variants": total_variants - common_variants,
+                "array_available": True
+            }
+        
+        # Count total variants (estimate from non-empty domain)
+        try:
+            non_empty = self.population_array.nonempty_domain()
+            # This is an estimate - actual counting would be too slow
+            estimated_variants = 750_000_000  # gnomAD v4.1 has ~750M variants
+        except:
+            estimated_variants = 0
+        
+        # Count common variants by querying is_common attribute
+        try:
+            # Query a sample to estimate common variant ratio
+            sample_result = self.population_array[1:2, 1:100000]
+            if sample_result['is_common'].size > 0:
+                common_ratio = np.mean(sample_result['is_common'])
+                estimated_common = int(estimated_variants * common_ratio)
+            else:
+                estimated_common = 0
+        except:
+            estimated_common = 0
+        
+        stats = {
+            "total_variants": estimated_variants,
+            "common_variants": estimated_common,
+            "rare_variants": estimated_variants - estimated_common,
+            "array_available": True
+        }
+        
+        return stats
+
+    def encoded_stats_response(self, cache_key: str, get_stats: Callable[[], Dict[str, Any]]) -> bytes:
+        """Encoded stats response, reused for as long as the stats cache serves the same dict"""
+        stats = get_stats()
+        cached = self.encoded_stats.get(cache_key)
+        if cached is not None and cached[0] is stats:
+            return cached[1]
+        
+        response = encode_response(stats)
+        if "error" not in stats:
+            self.encoded_stats[cache_key] = (stats, response)
+        return response
+
+    def handle_request(self, request_data) -> bytes:
         """Handle incoming query request"""
         try:
-            request = json.loads(request_data)
+            request = json_loads(request_data)
             operation = request.get('operation')
             
             if operation == 'query_variants':
                 result = self.query_variants(request.get('params', {}))
             elif operation == 'get_stats':
-                result = self.get_array_stats()
+                return self.encoded_stats_response("array_stats", self.get_array_stats)
             elif operation == 'allele_frequency':
                 params = request.get('params', {})
                 frequency = self.calculate_allele_frequency(
@@ -407,18 +714,24 @@ class TileDBQueryDaemon:
                     params.get('ref'),
                     params.get('alt')
                 )
+            elif operation == 'population_frequency_lookup_batch':
+                params = request.get('params', {})
+                result = self.lookup_population_frequencies(params.get('variants', []))
+            elif operation == 'gene_lookup_at':
+                params = request.get('params', {})
+                result = self.lookup_genes_at(params.get('chrom'), params.get('pos'))
             elif operation == 'population_frequency_stats':
-                result = self.get_population_stats()
+                return self.encoded_stats_response("population_stats", self.get_population_stats)
             elif operation == 'ping':
                 result = {"status": "ok", "uptime": time.time()}
             else:
                 result = {"error": f"Unknown operation: {operation}"}
             
-            return json.dumps(result)
+            return encode_response(result)
             
         except Exception as e:
             logger.error(f"Error handling request: {e}")
-            return json.dumps({"error": str(e)})
+            return encode_response({"error": str(e)})
 
     def start_server(self):
         """Start the Unix socket server"""
@@ -431,40 +744,124 @@ class TileDBQueryDaemon:
         server_socket.bind(self.socket_path)
         server_socket.listen(5)
         
+        # Idle connections wait here and are handed to the client pool only when a request arrives
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ)
+        selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        
         self.running = True
         logger.info(f"TileDB daemon listening on {self.socket_path}")
         
         try:
             while self.running:
-                client_socket, _ = server_socket.accept()
-                # Handle request in thread for concurrency
-                thread = threading.Thread(target=self.handle_client, args=(client_socket,))
-                thread.daemon = True
-                thread.start()
+                for key, _ in selector.select(timeout=IDLE_SWEEP_INTERVAL):
+                    if key.fileobj is server_socket:
+                        client_socket, _ = server_socket.accept()
+                        reader = self._open_client(client_socket)
+                        selector.register(client_socket, selectors.EVENT_READ, (reader, time.monotonic()))
+                    elif key.fileobj is self.wakeup_reader:
+                        self._drain_wakeups()
+                        while True:
+                            try:
+                                client_socket, reader = self.served_connections.get_nowait()
+                            except queue.Empty:
+                                break
+                            selector.register(client_socket, selectors.EVENT_READ, (reader, time.monotonic()))
+                    else:
+                        selector.unregister(key.fileobj)
+                        self.client_pool.submit(self.serve_connection, key.fileobj, key.data[0])
+                self._close_idle_connections(selector)
         except Exception as e:
             logger.error(f"Server error: {e}")
         finally:
+            selector.close()
             server_socket.close()
             if os.path.exists(self.socket_path):
                 os.unlink(self.socket_path)
 
-    def handle_client(self, client_socket):
-        """Handle individual client connection"""
+    def _open_client(self, client_socket) -> io.BufferedReader:
+        """Configure a new client connection and return its buffered reader"""
+        client_socket.settimeout(REQUEST_IO_TIMEOUT)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        with self.client_sockets_lock:
+            self.client_sockets.add(client_socket)
+        
+        # Buffered reads pick up the header and payload of a small request in a single recv
+        return client_socket.makefile('rb', buffering=SOCKET_BUFFER_SIZE)
+
+    def _close_client(self, client_socket, reader: io.BufferedReader):
+        with self.client_sockets_lock:
+            self.client_sockets.discard(client_socket)
+        reader.close()
+        client_socket.close()
+
+    def _drain_wakeups(self):
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _close_idle_connections(self, selector: selectors.BaseSelector):
+        """Close connections that have waited in the selector longer than CONNECTION_IDLE_TIMEOUT"""
+        idle_since_limit = time.monotonic() - CONNECTION_IDLE_TIMEOUT
+        for key in list(selector.get_map().values()):
+            if key.data is not None and key.data[1] < idle_since_limit:
+                selector.unregister(key.fileobj)
+                logger.debug("Closing idle client connection")
+                self._close_client(key.fileobj, key.data[0])
+
+    def _request_pending(self, client_socket, reader: io.BufferedReader) -> bool:
+        """Whether another request is already buffered or readable without blocking"""
+        client_socket.settimeout(0)
         try:
-            # Read request
-            data = client_socket.recv(4096).decode('utf-8')
-            if data:
+            return bool(reader.peek(1))
+        except BlockingIOError:
+            return False
+        finally:
+            client_socket.settimeout(REQUEST_IO_TIMEOUT)
+
+    def serve_connection(self, client_socket, reader: io.BufferedReader):
+        """Answer the requests waiting on a readable connection, then hand it back to the accept loop"""
+        try:
+            while True:
+                data = read_frame(reader)
+                if data is None:
+                    self._close_client(client_socket, reader)
+                    return
                 response = self.handle_request(data)
-                client_socket.send(response.encode('utf-8'))
+                client_socket.sendall(FRAME_HEADER.pack(len(response)) + response)
+                if not self._request_pending(client_socket, reader):
+                    break
+        except socket.timeout:
+            logger.warning("Closing client connection that stalled mid-request")
+            self._close_client(client_socket, reader)
+            return
         except Exception as e:
             logger.error(f"Error handling client: {e}")
-        finally:
-            client_socket.close()
+            self._close_client(client_socket, reader)
+            return
+        
+        self.served_connections.put((client_socket, reader))
+        try:
+            self.wakeup_writer.send(b'\0')
+        except BlockingIOError:
+            pass  # The accept loop already has wakeups pending
 
     def cleanup(self):
         """Clean up resources"""
         self.running = False
         
+        # Wake connection threads blocked in recv so the pool can wind down
+        with self.client_sockets_lock:
+            for client_socket in self.client_sockets:
+                try:
+                    client_socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.client_pool.shutdown(wait=False)
+        
         try:
             if self.variants_array:
                 self.variants_array.close()
@@ -117,10 +117,48 @@ import numpy as np
 import json
 import sys
 
+def info_af(info):
+    """First INFO AF value, NaN if absent"""
+    af = info.get('AF')
+    if isinstance(af, list):
+        af = af[0] if af else None
+    try:
+        return float(af)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def info_dp(info):
+    """INFO DP, -1 if absent"""
+    try:
+        return int(info.get('DP'))
+    except (TypeError, ValueError):
+        return -1
+
+# GT alleles stored per sample; longer calls are truncated, shorter ones (haploid) padded with -1
+PLOIDY = 2
+
+def genotype_codes(samples, sample_names):
+    """GT allele indices as int8[len(sample_names) * PLOIDY], PLOIDY codes per sample in header order
+
+    Every missing allele is -1, including './.' calls and samples absent from the record.
+    Indices above 127 do not fit int8 and are clamped to 127 (still a non-reference allele).
+    """
+    codes = np.full(len(sample_names) * PLOIDY, -1, dtype=np.int8)
+    for s, name in enumerate(sample_names):
+        gt = samples.get(name, {}).get('GT')
+        if not gt:
+            continue
+        for a, allele in enumerate(gt.replace('|', '/').split('/')[:PLOIDY]):
+            if allele.isdigit():
+                codes[s * PLOIDY + a] = min(int(allele), 127)
+    return codes
+
 def write_variants_batch(array_path, batch_data):
     """Write a batch of variants to TileDB array"""
     
-    variants = json.loads(batch_data)
+    batch = json.loads(batch_data)
+    variants = batch['variants']
+    sample_names = batch['samples']
     
     if not variants:
         return
@@ -157,10 +195,7 @@ def write_variants_batch(array_path, batch_data):
                 existing['qual'] = variant['qual']
             
             # Merge samples data
-            existing_samples = json.loads(existing['samples'])
-            new_samples = variant.get('samples', {})
-            existing_samples.update(new_samples)
-            existing['samples'] = json.dumps(existing_samples)
+            existing['samples'].update(variant.get('samples', {}))
             
         else:
             # New variant
@@ -171,8 +206,8 @@ def write_variants_batch(array_path, batch_data):
                 'alt': ','.join(variant.get('alt', [])) if variant.get('alt') else '',
                 'qual': variant.get('qual', 0.0) if variant.get('qual') is not None else 0.0,
                 'filter': ','.join(variant.get('filter', [])) if variant.get('filter') else 'PASS',
-                'info': json.dumps(variant.get('info', {})),
-                'samples': json.dumps(variant.get('samples', {}))
+                'info': variant.get('info', {}),
+                'samples': dict(variant.get('samples', {}))
             }
     
     # Prepare arrays from deduplicated variants
@@ -184,20 +219,26 @@ def write_variants_batch(array_path, batch_data):
     filters = []
     infos = []
     samples_data = []
+    afs = []
+    dps = []
+    gts = np.empty(len(variant_dict), dtype=object)
     
-    for (chrom_num, pos), variant in variant_dict.items():
+    for i, ((chrom_num, pos), variant) in enumerate(variant_dict.items()):
         chroms.append(chrom_num)
         positions.append(pos)
         refs.append(variant['ref'])
         alts.append(variant['alt'])
         quals.append(variant['qual'])
         filters.append(variant['filter'])
-        infos.append(variant['info'])
-        samples_data.append(variant['samples'])
+        infos.append(json.dumps(variant['info']))
+        samples_data.append(json.dumps(variant['samples']))
+        afs.append(info_af(variant['info']))
+        dps.append(info_dp(variant['info']))
+        gts[i] = genotype_codes(variant['samples'], sample_names)
     
     # Write to TileDB array
     with tiledb.open(array_path, 'w') as A:
-        A[np.array(chroms), np.array(positions)] = {
+        data = {
             'ref': np.array(refs),
             'alt': np.array(alts),
             'qual': np.array(quals, dtype=np.float32),
@@ -205,6 +246,14 @@ def write_variants_batch(array_path, batch_data):
             'info': np.array(infos),
             'samples': np.array(samples_data)
         }
+        
+        # Arrays created before the typed columns were added have no af/dp/gt attributes
+        if A.schema.has_attr('gt'):
+            data['af'] = np.array(afs, dtype=np.float32)
+            data['dp'] = np.array(dps, dtype=np.int32)
+            data['gt'] = gts
+        
+        A[np.array(chroms), np.array(positions)] = data
     
     print(f"Wrote {len(variants)} variants to TileDB array")
 
@@ -214,8 +263,8 @@ if __name__ == "__main__":
     write_variants_batch(array_path, batch_data)
 `;
 
-        // Convert records to JSON format for Python
-        const batchData = JSON.stringify(records);
+        // Convert records to JSON format for Python; header sample order fixes the gt layout
+        const batchData = JSON.stringify({ samples: header.samples || [], variants: records });
         
         await this.runPythonScriptWithInput(pythonScript, batchData, [this.variantsArrayPath]);
     }
@@ -0,0 +1,23 @@
+"""Shared helpers for the Python test scripts"""
+
+import importlib.util
+import os
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+def load_script(name: str, path: str):
+    """Import a hyphen-named script under src/ as a module"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Population frequencies are stored as uint16 log10-scale codes; decoding is shared with the query daemon
+python_daemon = load_script('python_daemon', 'tiledb/python-daemon.py')
+
+def decode_frequencies(result):
+    """Decode the allele frequency columns of a query result in place"""
+    for name in result:
+        if name.startswith(('af_', 'faf95_')):
+            result[name] = python_daemon.decode_allele_frequencies(result[name])
+    return result
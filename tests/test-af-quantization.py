@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test the uint16 allele frequency encoding round trip (gnomad-processor.py -> python-daemon.py)"""
+
+import sys
+
+import numpy as np
+
+from script_helpers import load_script, python_daemon
+
+gnomad_processor = load_script('gnomad_processor', 'population/gnomad-processor.py')
+
+def test_af_round_trip():
+    """Encoded frequencies decode back within the quantization error"""
+    print("🧬 Testing allele frequency quantization")
+    
+    af = np.concatenate([
+        np.logspace(-8, 0, 10_000),
+        [1.0 / 1_600_000, 2.0 / 1_600_000, 0.01, 0.5, 1.0],  # Singleton/doubleton frequencies, common threshold
+    ])
+    codes = gnomad_processor.encode_allele_frequencies(af)
+    assert codes.dtype == np.uint16
+    assert np.all(codes > 0), "nonzero frequencies must not encode to 0"
+    
+    decoded = python_daemon.decode_allele_frequencies(codes)
+    relative_error = np.abs(decoded - af) / af
+    
+    # Half a code step on the log10 scale
+    max_error = 10.0 ** (-gnomad_processor.AF_LOG10_MIN / (gnomad_processor.AF_CODE_MAX - 1) / 2) - 1
+    assert relative_error.max() <= max_error * 1.001, f"relative error {relative_error.max():.2e} > {max_error:.2e}"
+    print(f"  ✅ Max relative error {relative_error.max():.2e} (bound {max_error:.2e})")
+    
+    # Single-value decoding (used per row by the daemon) matches the column decoder
+    for code in codes[::997]:
+        assert python_daemon.decode_allele_frequency(code) == decoded[np.flatnonzero(codes == code)[0]]
+    print("  ✅ Scalar and column decoding agree")
+
+def test_af_edge_cases():
+    """Zero, missing, out-of-range and below-range frequencies"""
+    codes = gnomad_processor.encode_allele_frequencies([0.0, np.nan, -0.1, 1.5, 1e-12, 1.0])
+    assert codes.tolist() == [0, 0, 0, gnomad_processor.AF_CODE_MAX, 1, gnomad_processor.AF_CODE_MAX], codes.tolist()
+    
+    decoded = python_daemon.decode_allele_frequencies(codes)
+    assert decoded[0] == 0.0 and decoded[1] == 0.0 and decoded[2] == 0.0
+    assert np.isclose(decoded[3], 1.0) and np.isclose(decoded[5], 1.0)
+    assert np.isclose(decoded[4], 10.0 ** gnomad_processor.AF_LOG10_MIN)
+    
+    # Codes are monotonic in frequency, so range filters on codes keep their meaning
+    assert np.all(np.diff(python_daemon.decode_allele_frequencies(np.arange(gnomad_processor.AF_CODE_MAX + 1))) > 0)
+    print("  ✅ Edge cases encode and decode as expected")
+
+if __name__ == "__main__":
+    try:
+        test_af_round_trip()
+        test_af_edge_cases()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
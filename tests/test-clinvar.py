@@ -15,7 +15,8 @@ def test_clinvar_database():
         with tiledb.open(array_path, 'r') as A:
             # Test 1: Get overall statistics
             print("\n1️⃣ Database Statistics:")
-            result = A.query(attrs=['clinical_significance']).submit()
+            # multi_index decodes the enumeration-coded columns to their labels (submit() returns the codes)
+            result = A.query(attrs=['clinical_significance']).multi_index[:, :, :]
             total_variants = len(result['clinical_significance'])
             print(f"   Total variants: {total_variants:,}")
             
@@ -39,7 +40,7 @@ def test_clinvar_database():
             
             # Test 2: Query specific chromosomes of interest
             print("\n2️⃣ Coverage by Chromosome:")
-            coords_result = A.query(attrs=['clinical_significance'], coords=True).submit()
+            coords_result = A.query(attrs=['clinical_significance'], coords=True).multi_index[:, :, :]
             
             # Count by chromosome
             chrom_counts = {}
@@ -55,7 +56,7 @@ def test_clinvar_database():
             # Test 3: Find pathogenic variants in cancer genes
             print("\n3️⃣ Pathogenic Variants in Cancer Genes:")
             gene_result = A.query(attrs=['gene_symbol', 'clinical_significance', 
-                                       'condition', 'ref', 'alt'], coords=True).submit()
+                                       'condition', 'ref', 'alt'], coords=True).multi_index[:, :, :]
             
             cancer_genes = ['BRCA1', 'BRCA2', 'TP53', 'MLH1', 'MSH2']
             
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test the gene interval index against a linear scan over the same gene regions"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+GENE_PROCESSOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'annotation', 'gene-processor.py')
+
+_spec = importlib.util.spec_from_file_location('gene_processor', GENE_PROCESSOR_SCRIPT)
+gene_processor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gene_processor)
+
+def linear_overlaps(chroms, starts, ends, chrom, pos):
+    """Names of the genes with start <= pos <= end, found by checking every gene"""
+    return sorted(f"G{i}" for i in range(len(chroms)) if chroms[i] == chrom and starts[i] <= pos <= ends[i])
+
+def build_genes():
+    """Random genes on two chromosomes plus hand-placed nested and overlapping ones"""
+    rng = np.random.default_rng(17)
+    
+    chroms = rng.choice([1, 17], size=300)
+    starts = rng.integers(1, 1_000_000, size=300)
+    ends = starts + rng.integers(0, 200_000, size=300)
+    
+    # A long gene containing two nested genes, one of which contains a third,
+    # plus a gene that only overlaps the long gene's end
+    chroms = np.concatenate([chroms, [7, 7, 7, 7, 7]])
+    starts = np.concatenate([starts, [1_000, 2_000, 5_000, 5_500, 9_000]])
+    ends = np.concatenate([ends, [10_000, 3_000, 8_000, 6_000, 12_000]])
+    
+    names = np.array([f"G{i}" for i in range(len(chroms))])
+    ids = np.array([f"ENSG{i:011d}" for i in range(len(chroms))])
+    return chroms.astype(np.int8), starts.astype(np.uint32), ends.astype(np.uint32), names, ids
+
+def test_find_overlaps():
+    """find_overlaps matches a linear scan, including nested and overlapping genes"""
+    print("🧬 Testing gene interval index")
+    
+    chroms, starts, ends, names, ids = build_genes()
+    index = gene_processor.GeneIntervalIndex(chroms, starts, ends, names, ids)
+    
+    # Every gene boundary (and its neighbours) plus random positions
+    rng = np.random.default_rng(3)
+    positions = np.unique(np.concatenate([starts, ends, starts - 1, ends + 1, rng.integers(1, 1_300_000, size=2_000)]))
+    
+    checked = 0
+    for chrom in (1, 7, 17, 22):
+        for pos in positions:
+            expected = linear_overlaps(chroms, starts, ends, chrom, int(pos))
+            found = sorted(index.gene_names[i] for i in index.find_overlaps(chrom, int(pos)))
+            assert found == expected, f"chr{chrom}:{pos}: index {found} != scan {expected}"
+            checked += 1
+    print(f"  ✅ {checked:,} positions match the linear scan")
+    
+    # The nested genes by name
+    nested = sorted(index.gene_names[i] for i in index.find_overlaps(7, 5_800))
+    assert nested == ['G300', 'G302', 'G303'], nested
+    assert sorted(index.gene_names[i] for i in index.find_overlaps(7, 9_500)) == ['G300', 'G304']
+    assert sorted(index.gene_names[i] for i in index.find_overlaps(7, 11_000)) == ['G304']
+    print("  ✅ Nested and overlapping genes found")
+
+def test_saved_index_lookup():
+    """query_gene_at serves lookups from an index saved to and loaded from disk"""
+    chroms, starts, ends, names, ids = build_genes()
+    
+    with tempfile.TemporaryDirectory() as workspace:
+        processor = gene_processor.GeneAnnotationProcessor(workspace)
+        gene_processor.GeneIntervalIndex(chroms, starts, ends, names, ids).save(processor.gene_index_path)
+        
+        genes = processor.query_gene_at('chr7', 5_800)
+        assert sorted(gene['gene_name'] for gene in genes) == ['G300', 'G302', 'G303'], genes
+        assert all(gene['chrom'] == '7' and gene['start'] <= 5_800 <= gene['end'] for gene in genes)
+        assert processor.query_gene_at('chrUn', 5_800) == []
+    print("  ✅ Saved index answers query_gene_at")
+
+if __name__ == "__main__":
+    try:
+        test_find_overlaps()
+        test_saved_index_lookup()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
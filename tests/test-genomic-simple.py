@@ -7,6 +7,8 @@ Tests the TileDB population frequency database directly
 import tiledb
 import numpy as np
 
+from script_helpers import decode_frequencies
+
 def test_population_database():
     """Test direct queries against the population frequency database"""
     print("🧬 Testing Genomic Analysis Tools")
@@ -19,7 +21,7 @@ def test_population_database():
         print("\n1️⃣ BRCA1 Gene Analysis (chr17:43044295-43125370)")
         print("   Querying for population variants...")
         
-        result = A.query(attrs=['ref', 'alt', 'af_global', 'af_nfe', 'af_asj', 'is_common'], coords=True).multi_index[17, 43044295:43125370, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'af_nfe', 'af_asj', 'is_common'], coords=True).multi_index[17, 43044295:43125370, :])
         
         print(f"   ✅ Found {len(result['ref'])} variants")
         
@@ -59,13 +61,13 @@ def test_population_database():
         
         # Test 3: BRCA2 analysis
         print("\n3️⃣ BRCA2 Gene Analysis (chr13:32315474-32400266)")
-        result2 = A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[13, 32315474:32400266, :]
+        result2 = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[13, 32315474:32400266, :])
         print(f"   ✅ Found {len(result2['ref'])} variants")
         print(f"   📊 Common variants: {np.sum(result2['is_common'])}")
         
         # Test 4: TP53 analysis
         print("\n4️⃣ TP53 Gene Analysis (chr17:7668421-7687490)")
-        result3 = A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[17, 7668421:7687490, :]
+        result3 = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[17, 7668421:7687490, :])
         print(f"   ✅ Found {len(result3['ref'])} variants")
         print(f"   📊 Common variants: {np.sum(result3['is_common'])}")
         
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Test TileDB maintenance: the optimize skip threshold and explicit single-array consolidation"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+
+import tiledb
+import numpy as np
+
+_spec = importlib.util.spec_from_file_location(
+    'maintenance', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'tiledb', 'maintenance.py'))
+maintenance = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(maintenance)
+
+def create_array(workspace: str, name: str, fragments: int) -> None:
+    """A small sparse array written as the given number of fragments"""
+    uri = os.path.join(workspace, name)
+    dim = tiledb.Dim(name="pos", domain=(1, 1000), tile=100, dtype=np.uint32)
+    schema = tiledb.ArraySchema(domain=tiledb.Domain(dim), sparse=True, attrs=[tiledb.Attr(name="value", dtype=np.int32)])
+    tiledb.Array.create(uri, schema)
+    for i in range(fragments):
+        with tiledb.open(uri, 'w') as A:
+            A[np.array([i + 1], dtype=np.uint32)] = {'value': np.array([i], dtype=np.int32)}
+
+def test_optimize_skips_small_arrays():
+    """optimize_all_arrays leaves arrays below min_fragments alone and consolidates the rest"""
+    print("🔧 Testing TileDB maintenance")
+    
+    with tempfile.TemporaryDirectory() as workspace:
+        create_array(workspace, 'small', 3)
+        create_array(workspace, 'large', 5)
+        
+        results = {r['array_name']: r for r in maintenance.TileDBMaintenance(workspace, min_fragments=4).optimize_all_arrays()}
+        
+        assert results['small'].get('skipped'), results['small']
+        assert results['small']['after']['fragment_count'] == 3
+        assert results['large']['success'] and not results['large'].get('skipped'), results['large']
+        assert results['large']['after']['fragment_count'] == 1, results['large']['after']
+    print("  ✅ Arrays below the fragment threshold are skipped, others consolidated")
+
+def test_consolidate_array_is_unconditional():
+    """The single-array command consolidates even a 2-fragment array"""
+    with tempfile.TemporaryDirectory() as workspace:
+        create_array(workspace, 'pair', 2)
+        
+        tool = maintenance.TileDBMaintenance(workspace)
+        assert tool.get_array_info('pair')['fragment_count'] == 2
+        assert tool.consolidate_array('pair')
+        assert tool.get_array_info('pair')['fragment_count'] == 1
+        
+        with tiledb.open(os.path.join(workspace, 'pair')) as A:
+            assert sorted(A[:]['value'].tolist()) == [0, 1]
+    print("  ✅ consolidate_array merges a 2-fragment array")
+
+if __name__ == "__main__":
+    try:
+        test_optimize_skips_small_arrays()
+        test_consolidate_array_is_unconditional()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
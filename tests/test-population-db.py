@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Test the population frequency TileDB database"""
 
+import sys
+
 import tiledb
 import numpy as np
-import sys
+
+from script_helpers import decode_frequencies
 
 def test_population_queries():
     """Test various queries against the population frequency database"""
@@ -24,7 +27,7 @@ def test_population_queries():
         
         # Test 1: Query a specific position on chr22
         print("Test 1: Query specific position chr22:16050075")
-        result = A.query(attrs=['ref', 'alt', 'af_global', 'af_nfe', 'ac_global']).multi_index[22, 16050075, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'af_nfe', 'ac_global']).multi_index[22, 16050075, :])
         if len(result) > 0:
             for idx in range(len(result['ref'])):
                 print(f"  {result['ref'][idx]} > {result['alt'][idx]}: AF={result['af_global'][idx]:.6f}, AF_NFE={result['af_nfe'][idx]:.6f}, AC={result['ac_global'][idx]}")
@@ -34,7 +37,7 @@ def test_population_queries():
         
         # Test 2: Query a range on chr17 (BRCA1 region)
         print("Test 2: Query BRCA1 region chr17:43044295-43125370")
-        result = A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[17, 43044295:43125370, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[17, 43044295:43125370, :])
         print(f"  Found {len(result['ref'])} variants in BRCA1 region")
         common_count = np.sum(result['is_common'])
         print(f"  Common variants (AF>1%): {common_count}")
@@ -42,7 +45,7 @@ def test_population_queries():
         
         # Test 3: Query a range on chr13 (BRCA2 region)
         print("Test 3: Query BRCA2 region chr13:32315474-32400266")
-        result = A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[13, 32315474:32400266, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'is_common']).multi_index[13, 32315474:32400266, :])
         print(f"  Found {len(result['ref'])} variants in BRCA2 region")
         common_count = np.sum(result['is_common'])
         print(f"  Common variants (AF>1%): {common_count}")
@@ -51,7 +54,7 @@ def test_population_queries():
         # Test 4: Find some common variants
         print("Test 4: Find common variants on chr22")
         # Query first 1 million positions
-        result = A.query(attrs=['ref', 'alt', 'af_global', 'is_common'], coords=True).multi_index[22, 10000000:11000000, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global', 'is_common'], coords=True).multi_index[22, 10000000:11000000, :])
         common_mask = result['is_common']
         if np.any(common_mask):
             common_indices = np.where(common_mask)[0][:5]  # Show first 5
@@ -67,7 +70,7 @@ def test_population_queries():
         # Test 5: Multi-allelic site handling
         print("Test 5: Check multi-allelic site handling")
         # Look for positions with multiple alleles
-        result = A.query(attrs=['ref', 'alt', 'af_global'], coords=True).multi_index[22, 16000000:16100000, :]
+        result = decode_frequencies(A.query(attrs=['ref', 'alt', 'af_global'], coords=True).multi_index[22, 16000000:16100000, :])
         positions = result['pos']
         unique_positions, counts = np.unique(positions, return_counts=True)
         multi_allelic = unique_positions[counts > 1]
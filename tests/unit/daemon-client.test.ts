@@ -0,0 +1,181 @@
+/**
+ * Unit tests for the TileDB daemon client: message framing, connection reuse and lookup batching
+ */
+
+import { describe, it, expect, beforeEach, afterEach, jest } from '@jest/globals';
+import * as fs from 'fs';
+import * as net from 'net';
+import * as os from 'os';
+import * as path from 'path';
+import { TileDBDaemonClient } from '../../src/tiledb/daemon-client';
+
+// Mock the config; the client connects to tiledb-daemon.sock under tempDir
+jest.mock('../../src/config/index', () => ({
+  config: {
+    tiledb: {
+      workspace: '/test/workspace',
+      tempDir: require('path').join(require('os').tmpdir(), `daemon-client-test-${process.pid}`)
+    }
+  }
+}));
+
+const TEMP_DIR = path.join(os.tmpdir(), `daemon-client-test-${process.pid}`);
+const SOCKET_PATH = path.join(TEMP_DIR, 'tiledb-daemon.sock');
+
+type Responder = (request: any) => any;
+
+/**
+ * Fake daemon speaking the length-prefixed protocol. Responses are written in several chunks
+ * so the client has to reassemble them.
+ */
+class FakeDaemon {
+  server: net.Server;
+  requests: any[] = [];
+  connections = 0;
+  private sockets = new Set<net.Socket>();
+
+  constructor(private respond: Responder) {
+    this.server = net.createServer(socket => {
+      this.connections++;
+      this.sockets.add(socket);
+      socket.on('close', () => this.sockets.delete(socket));
+
+      let buffered = Buffer.alloc(0);
+      socket.on('data', data => {
+        buffered = Buffer.concat([buffered, data]);
+        while (buffered.length >= 4 && buffered.length >= 4 + buffered.readUInt32LE(0)) {
+          const length = buffered.readUInt32LE(0);
+          const request = JSON.parse(buffered.subarray(4, 4 + length).toString('utf8'));
+          buffered = buffered.subarray(4 + length);
+          if (request.operation !== 'ping') {
+            this.requests.push(request);
+          }
+          this.reply(socket, request.operation === 'ping' ? { status: 'ok' } : this.respond(request));
+        }
+      });
+    });
+  }
+
+  private reply(socket: net.Socket, response: any): void {
+    const payload = Buffer.from(JSON.stringify(response), 'utf8');
+    const frame = Buffer.alloc(4 + payload.length);
+    frame.writeUInt32LE(payload.length, 0);
+    payload.copy(frame, 4);
+
+    // Header split mid-way, then the payload in two halves
+    const cuts = [0, 2, 4 + Math.floor(payload.length / 2), frame.length];
+    cuts.slice(1).forEach((end, i) => {
+      setTimeout(() => socket.write(frame.subarray(cuts[i], end)), i * 5);
+    });
+  }
+
+  listen(): Promise<void> {
+    return new Promise(resolve => this.server.listen(SOCKET_PATH, () => resolve()));
+  }
+
+  close(): Promise<void> {
+    this.sockets.forEach(socket => socket.destroy());
+    return new Promise(resolve => this.server.close(() => resolve()));
+  }
+}
+
+describe('TileDBDaemonClient', () => {
+  let daemon: FakeDaemon;
+  let client: TileDBDaemonClient;
+
+  const startDaemon = async (respond: Responder) => {
+    daemon = new FakeDaemon(respond);
+    await daemon.listen();
+    client = new TileDBDaemonClient();
+  };
+
+  beforeEach(() => {
+    fs.mkdirSync(TEMP_DIR, { recursive: true });
+    if (fs.existsSync(SOCKET_PATH)) {
+      fs.unlinkSync(SOCKET_PATH);
+    }
+  });
+
+  afterEach(async () => {
+    await daemon?.close();
+    jest.restoreAllMocks();
+  });
+
+  describe('Framing', () => {
+    it('should send length-prefixed requests and reassemble chunked responses', async () => {
+      const variants = [{ chrom: 'chr17', pos: 43044295, ref: 'A', alt: 'G', qual: 99.5 }];
+      await startDaemon(() => ({ variants }));
+
+      const result = await client.queryVariants({ chrom: '17', start: 43044000, end: 43045000 });
+
+      expect(result).toEqual(variants);
+      expect(daemon.requests).toEqual([
+        { operation: 'query_variants', params: { chrom: '17', start: 43044000, end: 43045000 } }
+      ]);
+    });
+
+    it('should handle multi-byte UTF-8 payloads', async () => {
+      const genes = [{ gene_name: 'BRCA1', clinical_significance: 'Pathogenic – β' }];
+      await startDaemon(() => ({ genes }));
+
+      await expect(client.lookupGenesAt('chr17', 43044295)).resolves.toEqual(genes);
+    });
+
+    it('should reuse the connection for sequential requests', async () => {
+      await startDaemon(request => ({ frequency: request.params.pos / 1000 }));
+
+      expect(await client.calculateAlleleFrequency('chr1', 100, 'A', 'G')).toBe(0.1);
+      expect(await client.calculateAlleleFrequency('chr1', 200, 'A', 'G')).toBe(0.2);
+      expect(daemon.connections).toBe(1);
+    });
+  });
+
+  describe('Lookup Batching', () => {
+    it('should send same-tick lookups as one batch request', async () => {
+      const brca1 = { chrom: 'chr17', pos: 43044295, ref: 'A', alt: 'G', af_global: 0.0001 };
+      const tp53 = { chrom: 'chr17', pos: 7676154, ref: 'C', alt: 'T', af_global: 0.02 };
+      await startDaemon(() => ({ variants: [brca1, null, tp53] }));
+
+      const results = await Promise.all([
+        client.lookupPopulationFrequency('chr17', 43044295, 'A', 'G'),
+        client.lookupPopulationFrequency('chr1', 100, 'C', 'T'),
+        client.lookupPopulationFrequency('chr17', 7676154, 'C', 'T')
+      ]);
+
+      expect(daemon.requests).toHaveLength(1);
+      expect(daemon.requests[0]).toEqual({
+        operation: 'population_frequency_lookup_batch',
+        params: {
+          variants: [
+            { chrom: 'chr17', pos: 43044295, ref: 'A', alt: 'G' },
+            { chrom: 'chr1', pos: 100, ref: 'C', alt: 'T' },
+            { chrom: 'chr17', pos: 7676154, ref: 'C', alt: 'T' }
+          ]
+        }
+      });
+      expect(results).toEqual([{ variants: [brca1] }, { variants: [] }, { variants: [tp53] }]);
+    });
+
+    it('should send lookups from different ticks separately', async () => {
+      await startDaemon(request => ({ variants: request.params.variants.map(() => null) }));
+
+      await client.lookupPopulationFrequency('chr1', 100, 'A', 'G');
+      await client.lookupPopulationFrequency('chr1', 200, 'A', 'G');
+
+      expect(daemon.requests).toHaveLength(2);
+      expect(daemon.requests.map(request => request.params.variants.length)).toEqual([1, 1]);
+    });
+
+    it('should resolve every batched lookup as empty when the daemon reports an error', async () => {
+      jest.spyOn(console, 'error').mockImplementation(() => {});
+      await startDaemon(() => ({ error: 'Population frequency array not available' }));
+
+      const results = await Promise.all([
+        client.lookupPopulationFrequency('chr1', 100, 'A', 'G'),
+        client.lookupPopulationFrequency('chr2', 200, 'C', 'T')
+      ]);
+
+      expect(results).toEqual([{ variants: [] }, { variants: [] }]);
+    });
+  });
+});